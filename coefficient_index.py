@@ -0,0 +1,298 @@
+"""
+Module for finding the candidate matches of the ripples by the equations fitted to them instead of by their values.
+Every ripple is a point made of its fitted curve, length and position of the max, and a KD-tree of the
+points gives the nearest ones of each ripple- only those pairs are then compared value by value.
+
+It is experimental and only used through Analyze.compare_graphs_nearest()- launch always compares all the pairs.
+The connections that are not among the candidates are missed, and nothing reports them outside recall_report().
+On an export of 5,476 ripples with min_percent 0.7, the exact comparison took 2.5 s; with 10/50/200 candidates
+the index took 0.75/1.2/2.9 s and found 17/41/74% of the connections (the best match of 32/55/81% of the
+ripples). With min_percent set, the exact comparison skips most pairs by itself, so the index can be slower.
+"""
+
+import time
+import typing as t
+
+import numpy as np
+
+from connection_matrix import ConnectionMatrix
+from ripple import Ripple
+from ripple_fit import evaluate_equations
+from similarity import AlignedGraphs, find_connection_matrix, find_pair_connections
+
+# max number of points in a leaf of the KD-tree- they are compared all at once
+LEAF_SIZE = 64
+
+# the number of points of the fitted curve in the features of a ripple, spread from its start to its end
+CURVE_POINTS = 8
+
+# the weight of the length (in log scale) and of the relative position of the max, next to the curve points
+LENGTH_WEIGHT = 1.0
+MAX_POSITION_WEIGHT = 1.0
+
+
+def coefficient_features(ripple_list: t.List[Ripple]) -> np.ndarray:
+    """
+    Function that returns the point of every ripple in the space of the index. The coefficients are not used as
+    they are- for a degree 5 polynomial, close curves can have very different coefficients- but through the values
+    of the fitted curve at CURVE_POINTS positions spread over the ripple, which are a linear function of them. The
+    equation is fitted to the normalized values (see ripple_fit.fit_equations()), so the values are around 0-1.
+
+    Args:
+        ripple_list: the list of ripples
+
+    Returns:
+        float array of shape (ripple count, CURVE_POINTS + 2): the values of the curve, the weighted log of the
+        length and the weighted position of the max as a fraction of the length
+    """
+    coefficients = np.array([[ripple.a, ripple.b, ripple.c, ripple.d, ripple.e, ripple.f] for ripple in ripple_list],
+                            dtype=np.float64).reshape(-1, 6)
+    length = np.array([len(ripple.normalized_graph) for ripple in ripple_list], dtype=np.float64)
+    max_index = np.array([ripple.max_index for ripple in ripple_list], dtype=np.float64)
+
+    # the positions on the axis repositioned at the max, from -max_index to the end
+    fractions = np.linspace(0, 1, CURVE_POINTS)[None, :]
+    x = fractions * (length[:, None] - 1) - max_index[:, None]
+
+    return np.column_stack([evaluate_equations(coefficients, x),
+                            LENGTH_WEIGHT * np.log(length),
+                            MAX_POSITION_WEIGHT * max_index / np.maximum(length - 1, 1)])
+
+
+class KDTree:
+    """
+    KD-tree over a set of points, stored in arrays. Every node is a range of the points sorted by the tree (order),
+    split at the median of its widest dimension until at most LEAF_SIZE points are left.
+    (points= float array of shape (point count, dimensions)| order= int array of the points in tree order|
+    start/end= int arrays with the range of every node in order| left/right= int arrays with the child nodes,
+    -1 for the leaves| lower/upper= float arrays with the bounding box of the points of every node)
+    """
+
+    def __init__(self, points: np.ndarray):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.order = np.arange(len(self.points))
+
+        start, end, left, right = [0], [len(self.points)], [-1], [-1]
+        stack = [0]
+
+        while stack:
+            node = stack.pop()
+            count = end[node] - start[node]
+            if count <= LEAF_SIZE:
+                continue
+
+            members = self.order[start[node]:end[node]]
+            spread = self.points[members].max(axis=0) - self.points[members].min(axis=0)
+            dimension = int(np.argmax(spread))
+            if spread[dimension] == 0:
+                # all the points are the same
+                continue
+
+            half = count // 2
+            self.order[start[node]:end[node]] = members[np.argpartition(self.points[members, dimension], half)]
+
+            for child_start, child_end in ((start[node], start[node] + half), (start[node] + half, end[node])):
+                start.append(child_start)
+                end.append(child_end)
+                left.append(-1)
+                right.append(-1)
+                stack.append(len(start) - 1)
+            left[node], right[node] = len(start) - 2, len(start) - 1
+
+        self.start = np.array(start)
+        self.end = np.array(end)
+        self.left = np.array(left)
+        self.right = np.array(right)
+
+        self.lower = np.array([self.points[self.order[s:e]].min(axis=0) for s, e in zip(start, end)])
+        self.upper = np.array([self.points[self.order[s:e]].max(axis=0) for s, e in zip(start, end)])
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def nearest(self, k: int) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Method that finds the k nearest points of every point of the tree, itself excluded. The points of a leaf
+        search the tree together, so a node is only skipped when it is farther than the k-th neighbour found so
+        far for all of them.
+
+        Args:
+            k: the number of neighbours per point
+
+        Returns:
+            (neighbours, distances): int array of shape (point count, k) with the indexes of the neighbours,
+                                    closest first- -1 when there are less than k other points- and float array of
+                                    their squared distances
+        """
+        k = max(0, min(k, len(self) - 1))
+        neighbours = np.full((len(self), k), -1, dtype=np.int64)
+        distances = np.full((len(self), k), np.inf)
+
+        if k == 0:
+            return neighbours, distances
+
+        for leaf in np.flatnonzero(self.left < 0):
+            queries = self.order[self.start[leaf]:self.end[leaf]]
+            query_points = self.points[queries]
+            best_index = np.full((len(queries), k), -1, dtype=np.int64)
+            best_distance = np.full((len(queries), k), np.inf)
+
+            stack = [0]
+            while stack:
+                node = stack.pop()
+                # the squared distance of every query to the bounding box of the node
+                outside = np.maximum(self.lower[node] - query_points, 0) + np.maximum(query_points - self.upper[node], 0)
+                if not ((outside ** 2).sum(axis=1) < best_distance[:, -1]).any():
+                    continue
+
+                if self.left[node] < 0:
+                    members = self.order[self.start[node]:self.end[node]]
+                    distance = ((query_points[:, None, :] - self.points[members][None, :, :]) ** 2).sum(axis=2)
+                    distance[queries[:, None] == members[None, :]] = np.inf
+
+                    candidate_index = np.concatenate([best_index, np.broadcast_to(members, distance.shape)], axis=1)
+                    candidate_distance = np.concatenate([best_distance, distance], axis=1)
+                    # stable, so among equal distances the neighbours found first are kept
+                    best = np.argsort(candidate_distance, axis=1, kind="stable")[:, :k]
+                    best_index = np.take_along_axis(candidate_index, best, axis=1)
+                    best_distance = np.take_along_axis(candidate_distance, best, axis=1)
+                else:
+                    # the closer child is searched first, so the other one is more likely to be skipped
+                    center = query_points.mean(axis=0)
+                    children = [self.left[node], self.right[node]]
+                    gaps = [((np.maximum(self.lower[child] - center, 0) + np.maximum(center - self.upper[child], 0))
+                             ** 2).sum() for child in children]
+                    stack += [children[1], children[0]] if gaps[0] <= gaps[1] else children
+
+            best_index[np.isinf(best_distance)] = -1
+            neighbours[queries] = best_index
+            distances[queries] = best_distance
+
+        return neighbours, distances
+
+
+class CoefficientIndex:
+    """
+    Index of the ripples in the space of coefficient_features(), with one KDTree per max position class of
+    AlignedGraphs, since the ripples of different classes are never connected.
+    (graphs= the AlignedGraphs of the ripples| features= float array of the points| trees= list of (ripple indexes
+    of the class, KDTree))
+    """
+
+    def __init__(self, ripple_list: t.List[Ripple], graphs: t.Optional[AlignedGraphs] = None):
+        self.graphs = AlignedGraphs(ripple_list) if graphs is None else graphs
+        self.features = coefficient_features(ripple_list)
+
+        self.trees = []
+        for position_class in np.unique(self.graphs.max_position_class).tolist():
+            members = np.flatnonzero(self.graphs.max_position_class == position_class)
+            self.trees.append((members, KDTree(self.features[members])))
+
+    def candidate_pairs(self, candidates: int) -> t.Tuple[np.ndarray, np.ndarray]:
+        """
+        Method that returns the pairs of every ripple with its nearest candidates in its tree- a pair can be
+        found from both of its ripples
+
+        Args:
+            candidates: the number of nearest ripples per ripple
+
+        Returns:
+            (index1, index2): int arrays with the ripple indexes of the pairs
+        """
+        index1, index2 = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+
+        for members, tree in self.trees:
+            neighbours, distances = tree.nearest(candidates)
+            found = neighbours >= 0
+            index1.append(np.repeat(members, found.sum(axis=1)))
+            index2.append(members[neighbours[found]])
+
+        return np.concatenate(index1), np.concatenate(index2)
+
+    def find_connections(self, candidates: int, min_percent: float = 0.0,
+                         top_k: t.Optional[int] = None) -> ConnectionMatrix:
+        """
+        Method that compares every ripple only with its nearest candidates, value by value- the connections of
+        those pairs are the same as for find_connection_matrix(), but the pairs that are not candidates are missed
+
+        Args:
+            candidates: the number of nearest ripples per ripple
+            min_percent/top_k: see find_connection_matrix()
+
+        Returns:
+            the ConnectionMatrix of the connections
+        """
+        index1, index2 = self.candidate_pairs(candidates)
+        return find_pair_connections(self.graphs, index1, index2, min_percent=min_percent, top_k=top_k)
+
+
+def recall_report(ripple_list: t.List[Ripple], candidate_counts: t.Iterable[int] = (5, 10, 20, 50),
+                  min_percent: float = 0.0) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Function that measures the tradeoff between speed and recall of the index against the exact comparison of
+    all the pairs.
+
+    Args:
+        ripple_list: the list of ripples
+        candidate_counts: the numbers of candidates per ripple to measure
+        min_percent: the min percentage of a connection, see find_connection_matrix()
+
+    Returns:
+        list of dicts, the first one for the exact comparison and then one per number of candidates, with the
+        time in seconds, the number of compared pairs, the number of connections found, their recall- the part
+        of the exact connections that were found- and the best match recall- the part of the ripples whose best
+        exact match was found
+    """
+    graphs = AlignedGraphs(ripple_list)
+
+    start = time.perf_counter()
+    exact = find_connection_matrix(graphs, min_percent=min_percent)
+    exact_time = time.perf_counter() - start
+
+    exact_pairs = _connection_keys(exact)
+    best_pairs = _best_match_keys(exact)
+    ripple_count = len(ripple_list)
+
+    report = [{"candidates": "all", "seconds": round(exact_time, 3),
+               "compared pairs": ripple_count * (ripple_count - 1) // 2,
+               "connections": len(exact_pairs), "recall": 1.0, "best match recall": 1.0}]
+
+    start = time.perf_counter()
+    index = CoefficientIndex(ripple_list, graphs=graphs)
+    build_time = time.perf_counter() - start
+
+    for candidates in candidate_counts:
+        start = time.perf_counter()
+        index1, index2 = index.candidate_pairs(candidates)
+        found = find_pair_connections(graphs, index1, index2, min_percent=min_percent)
+        seconds = build_time + time.perf_counter() - start
+
+        found_pairs = _connection_keys(found)
+        compared = len(np.unique(np.minimum(index1, index2) * ripple_count + np.maximum(index1, index2)))
+
+        report.append({"candidates": candidates, "seconds": round(seconds, 3), "compared pairs": compared,
+                       "connections": len(found_pairs),
+                       "recall": _part_found(exact_pairs, found_pairs),
+                       "best match recall": _part_found(best_pairs, found_pairs)})
+
+    return report
+
+
+def _connection_keys(matrix: ConnectionMatrix) -> np.ndarray:
+    """Returns the connections of a matrix as sorted int keys origin*count+comparison"""
+    origins, comparisons, scores = matrix.to_coo()
+    return np.sort(origins.astype(np.int64) * len(matrix) + comparisons)
+
+
+def _best_match_keys(matrix: ConnectionMatrix) -> np.ndarray:
+    """Returns the best connection of every ripple that has one, as keys of _connection_keys()"""
+    has_connections = np.flatnonzero(np.diff(matrix.indptr) > 0)
+    best = matrix.indices[matrix.indptr[has_connections + 1] - 1]
+    return np.sort(has_connections.astype(np.int64) * len(matrix) + best)
+
+
+def _part_found(expected: np.ndarray, found: np.ndarray) -> float:
+    """Returns the part of the expected keys that are in the found keys, 1 if nothing is expected"""
+    if len(expected) == 0:
+        return 1.0
+    return round(float(np.isin(expected, found).mean()), 4)
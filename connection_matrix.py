@@ -0,0 +1,151 @@
+"""
+Module for the sparse storage of the connections between ripples. Instead of one list of tuples(percentage, origin,
+comparison) per ripple, the connections are kept in three arrays in CSR layout, which are saved to and loaded
+from a single binary file without being copied
+"""
+
+import typing as t
+from pathlib import Path
+
+import numpy as np
+
+from ripple import round_values
+
+# the first bytes of a connection file, followed by the ripple count and the connection count as int64
+FILE_MAGIC = b"RIPCONN1"
+
+
+class ConnectionMatrix:
+    """
+    Sparse matrix of the connections between ripples, in CSR layout. (indptr= int64 array with ripple count + 1
+    positions- the connections of ripple i are the items indptr[i]:indptr[i+1] of the other arrays| indices= int32
+    array with the ripple each connection goes to| scores= float32 array with the percentage of each connection)
+
+    The connections of every ripple are sorted by percentage and then by ripple, as the lists of
+    Analyze.compare_graphs(), so the last one is the best match. The percentages have 2 decimals, which float32
+    keeps exactly enough for round(score, 2) to give them back.
+    """
+
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, scores: np.ndarray):
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    def __len__(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def connection_count(self) -> int:
+        return len(self.indices)
+
+    def row(self, index: int) -> t.List[t.Tuple[float, int, int]]:
+        """Returns the connections of one ripple, as a list of tuples(percentage, origin, comparison)"""
+        start, end = int(self.indptr[index]), int(self.indptr[index + 1])
+        percents = round_values(self.scores[start:end].astype(np.float64), 2).tolist()
+
+        return [(percent, index, to) for percent, to in zip(percents, self.indices[start:end].tolist())]
+
+    def to_lists(self) -> t.List[t.List[t.Tuple[float, int, int]]]:
+        """Returns the connections as the list of lists of tuples(percentage, origin, comparison) of compare_graphs()"""
+        percents = round_values(self.scores.astype(np.float64), 2).tolist()
+        to = self.indices.tolist()
+        bounds = self.indptr.tolist()
+
+        return [[(percents[k], index, to[k]) for k in range(bounds[index], bounds[index + 1])]
+                for index in range(len(self))]
+
+    def to_coo(self) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the connections in COO layout, as (origins, comparisons, scores) arrays in the same order"""
+        origins = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+        return origins, self.indices, self.scores
+
+    def save(self, path: Path) -> None:
+        """
+        Method that writes the matrix to a single binary file: FILE_MAGIC, the ripple count and the connection
+        count, followed by the bytes of indptr, indices and scores
+        """
+        header = np.array([len(self), self.connection_count], dtype='<i8')
+
+        with open(path, "wb") as file:
+            file.write(FILE_MAGIC)
+            file.write(header.tobytes())
+            file.write(np.ascontiguousarray(self.indptr, dtype='<i8').tobytes())
+            file.write(np.ascontiguousarray(self.indices, dtype='<i4').tobytes())
+            file.write(np.ascontiguousarray(self.scores, dtype='<f4').tobytes())
+
+
+def load_connection_matrix(path: Path) -> ConnectionMatrix:
+    """
+    Function that reads a matrix written by ConnectionMatrix.save(). The file is memory mapped, so the arrays are
+    read only views of it and nothing is read before it is used
+
+    Args:
+        path: the path of the file
+
+    Returns:
+        the ConnectionMatrix of the file
+    """
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    if data[:len(FILE_MAGIC)].tobytes() != FILE_MAGIC:
+        raise Exception(f'The file is not a connection matrix: {path}')
+
+    position = len(FILE_MAGIC)
+    ripple_count, connection_count = (int(value) for value in data[position:position + 16].view('<i8'))
+    position += 16
+
+    indptr = data[position:position + (ripple_count + 1) * 8].view('<i8')
+    position += (ripple_count + 1) * 8
+    indices = data[position:position + connection_count * 4].view('<i4')
+    position += connection_count * 4
+    scores = data[position:position + connection_count * 4].view('<f4')
+
+    return ConnectionMatrix(indptr=indptr, indices=indices, scores=scores)
+
+
+def build_connection_matrix(ripple_count: int, origins: np.ndarray, comparisons: np.ndarray, scores: np.ndarray,
+                            top_k: t.Optional[int] = None) -> ConnectionMatrix:
+    """
+    Function that builds the matrix from connections in COO layout, in any order
+
+    Args:
+        ripple_count: the number of ripples
+        origins/comparisons: int arrays with the two ripples of every connection
+        scores: float array with the percentage of every connection, for its origin
+        top_k: the max number of connections kept per ripple- the best ones. None keeps all of them
+
+    Returns:
+        the ConnectionMatrix of the connections
+    """
+    scores = np.asarray(scores, dtype=np.float32)
+    order = np.lexsort((comparisons, scores, origins))
+    origins = np.asarray(origins, dtype=np.int32)[order]
+    comparisons = np.asarray(comparisons, dtype=np.int32)[order]
+    scores = scores[order]
+
+    counts = np.bincount(origins, minlength=ripple_count)
+
+    if top_k is not None and len(origins) and counts.max() > top_k:
+        # the position of every connection counted from the end of its ripple- the last one is 0
+        ends = np.cumsum(counts)
+        from_end = ends[origins] - 1 - np.arange(len(origins))
+        kept = from_end < top_k
+        origins, comparisons, scores = origins[kept], comparisons[kept], scores[kept]
+        counts = np.minimum(counts, top_k)
+
+    indptr = np.zeros(ripple_count + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+
+    return ConnectionMatrix(indptr=indptr, indices=comparisons, scores=scores)
+
+
+def connection_matrix_from_lists(connections: t.List[t.List[t.Tuple[float, int, int]]]) -> ConnectionMatrix:
+    """
+    Function that builds the matrix from the list of lists of tuples(percentage, origin, comparison) of
+    Analyze.compare_graphs()
+    """
+    flat = [item for element in connections for item in element]
+    scores = np.array([item[0] for item in flat], dtype=np.float32)
+    origins = np.array([item[1] for item in flat], dtype=np.int32)
+    comparisons = np.array([item[2] for item in flat], dtype=np.int32)
+
+    return build_connection_matrix(len(connections), origins, comparisons, scores)
@@ -1,4 +1,5 @@
 ANALYSIS_XLSX_FILE_NAME = "analysis_summary"
 GLUCOSE_DB="glucose"
 GLUCOSE_ANALYSIS_DB="glucose_analysis"
-GLUCOSE_STATS_DB="glucose_statistic"
\ No newline at end of file
+GLUCOSE_STATS_DB="glucose_statistic"
+CONNECTIONS_FILE_NAME="connections"
@@ -2,12 +2,70 @@
 Data acquisition module that imports the data from the csv
 """
 
+import hashlib
+import typing as t
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 CURRENT_PATH_CWD = Path.cwd()
 
+# Dexcom export column names and the fixed format of the timestamp column
+TIMESTAMP_COLUMN = 'Timestamp (YYYY-MM-DDThh:mm:ss)'
+EVENT_SUBTYPE_COLUMN = 'Event Subtype'
+GLUCOSE_COLUMN = 'Glucose Value (mg/dL)'
+INSULIN_COLUMN = 'Insulin Value (u)'
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+# only the columns used by the glucose and insulin frames are read- all are read as text and converted afterwards
+# because the value columns may contain entries such as "Low" or "High"
+USED_COLUMNS_DTYPES = {
+    TIMESTAMP_COLUMN: str,
+    EVENT_SUBTYPE_COLUMN: str,
+    GLUCOSE_COLUMN: str,
+    INSULIN_COLUMN: str,
+}
+
+# number of CSV rows parsed at once in streaming mode
+DEFAULT_CHUNK_SIZE = 100_000
+
+# the version of the preprocessing- bump it whenever the cleaning changes so the old caches are rebuilt
+PREPROCESSING_VERSION = 1
+CACHE_SUFFIX = ".cache.npz"
+
+
+class _ColumnBuffer:
+    """
+    Preallocated typed array that cleaned values are appended to. When full, the capacity doubles,
+    so appending chunks costs amortized O(1) per value and no per-chunk frames are kept alive.
+    """
+
+    def __init__(self, dtype: str, capacity: int = DEFAULT_CHUNK_SIZE):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def append(self, values: np.ndarray) -> None:
+        """
+        Copy the values at the end of the buffer, growing it if needed.
+
+        Args:
+            values: a 1D array of the same dtype as the buffer
+        """
+        needed = self._size + len(values)
+
+        if needed > len(self._data):
+            grown = np.empty(max(needed, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+
+        self._data[self._size:needed] = values
+        self._size = needed
+
+    def values(self) -> np.ndarray:
+        """Returns the filled part of the buffer"""
+        return self._data[:self._size]
+
 
 def read_csv_file(file_name: str) -> pd.DataFrame:
     """
@@ -22,6 +80,27 @@ def read_csv_file(file_name: str) -> pd.DataFrame:
     Raises:
         Exception: If the input CSV file is missing or corrupted.
     """
+    file_path = _get_file_path(file_name=file_name)
+
+    # Read the CSV file and return the DataFrame
+    df = pd.read_csv(filepath_or_buffer=file_path, index_col=0)
+
+    return df
+
+
+def _get_file_path(file_name: str) -> Path:
+    """
+    Return the path of the input CSV file, checking that it exists.
+
+    Args:
+        file_name: The name of the input CSV file.
+
+    Returns:
+        The path of the CSV file.
+
+    Raises:
+        Exception: If the input CSV file is missing.
+    """
     # Combine the current working directory path with the file name
     file_path = CURRENT_PATH_CWD / file_name
 
@@ -30,10 +109,172 @@ def read_csv_file(file_name: str) -> pd.DataFrame:
         # Raise an exception if the file is missing
         raise Exception(f'The expected input file name does not exist at path: {file_path}')
 
-    # Read the CSV file and return the DataFrame
-    df = pd.read_csv(filepath_or_buffer=file_path, index_col=0)
+    return file_path
 
-    return df
+
+def get_glucose_and_insulin_data(file_name: str, chunk_size: t.Optional[int] = None) \
+        -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Create the glucose and insulin dataframes from a given CSV file by reading and parsing it only once.
+    Only the used columns are read, and the timestamps are parsed with the fixed Dexcom format.
+
+    Args:
+        file_name: The name of the input CSV file.
+        chunk_size: if given, the file is streamed in chunks of this many rows (see stream_glucose_and_insulin_data),
+                    so the memory used does not grow with the size of the export
+
+    Returns:
+        (glucose, insulin): tuple of preprocessed Pandas DataFrames, the same as the ones returned by
+                            get_glucose_data() and get_insulin_data()
+
+    Raises:
+        Exception: If the input CSV file is missing or corrupted.
+    """
+    if chunk_size is not None:
+        return stream_glucose_and_insulin_data(file_name=file_name, chunk_size=chunk_size)
+
+    file_path = _get_file_path(file_name=file_name)
+
+    # Read only the relevant columns, as text
+    df = pd.read_csv(filepath_or_buffer=file_path, usecols=list(USED_COLUMNS_DTYPES), dtype=USED_COLUMNS_DTYPES)
+
+    return _split_glucose_and_insulin(df=df)
+
+
+def stream_glucose_and_insulin_data(file_name: str, chunk_size: int = DEFAULT_CHUNK_SIZE) \
+        -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Create the glucose and insulin dataframes by streaming the CSV file in chunks of bounded size.
+    Each chunk is cleaned on the fly (timestamp parsing, numeric coercion, removal of nulls) and only
+    the cleaned values are appended into typed arrays, so the raw rows never stay in memory.
+
+    Args:
+        file_name: The name of the input CSV file.
+        chunk_size: the number of rows parsed at once
+
+    Returns:
+        (glucose, insulin): tuple of preprocessed Pandas DataFrames, the same as the ones returned by
+                            get_glucose_and_insulin_data()
+
+    Raises:
+        Exception: If the input CSV file is missing or corrupted.
+    """
+    file_path = _get_file_path(file_name=file_name)
+
+    glucose_time = _ColumnBuffer('datetime64[ns]', capacity=chunk_size)
+    glucose_value = _ColumnBuffer('float64', capacity=chunk_size)
+    insulin_time = _ColumnBuffer('datetime64[ns]', capacity=chunk_size)
+    insulin_type = _ColumnBuffer('object', capacity=chunk_size)
+    insulin_value = _ColumnBuffer('float64', capacity=chunk_size)
+
+    with pd.read_csv(filepath_or_buffer=file_path, usecols=list(USED_COLUMNS_DTYPES), dtype=USED_COLUMNS_DTYPES,
+                     chunksize=chunk_size) as reader:
+        for chunk in reader:
+            glucose, insulin = _split_glucose_and_insulin(df=chunk)
+
+            glucose_time.append(glucose['Timestamp'].to_numpy(dtype='datetime64[ns]'))
+            glucose_value.append(glucose[GLUCOSE_COLUMN].to_numpy(dtype='float64'))
+
+            insulin_time.append(insulin['Timestamp'].to_numpy(dtype='datetime64[ns]'))
+            insulin_type.append(insulin['Type'].to_numpy(dtype='object'))
+            insulin_value.append(insulin['Value'].to_numpy(dtype='float64'))
+
+    return _build_frames(glucose_time=glucose_time.values(), glucose_value=glucose_value.values(),
+                         insulin_time=insulin_time.values(), insulin_type=insulin_type.values(),
+                         insulin_value=insulin_value.values())
+
+
+def get_cached_glucose_and_insulin_data(file_name: str, chunk_size: t.Optional[int] = None) \
+        -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Create the glucose and insulin dataframes, using a binary columnar cache stored next to the CSV file.
+    The cache is keyed by a hash of the file content and the preprocessing version, so it is rebuilt
+    automatically when the export changes.
+
+    Args:
+        file_name: The name of the input CSV file.
+        chunk_size: used when the cache is (re)built, see get_glucose_and_insulin_data()
+
+    Returns:
+        (glucose, insulin): tuple of preprocessed Pandas DataFrames, the same as the ones returned by
+                            get_glucose_and_insulin_data()
+
+    Raises:
+        Exception: If the input CSV file is missing or corrupted.
+    """
+    file_path = _get_file_path(file_name=file_name)
+    cache_path = file_path.with_name(file_path.name + CACHE_SUFFIX)
+    cache_key = _get_cache_key(file_path=file_path)
+
+    # Load from the cache if it was built from the same content with the same preprocessing
+    if cache_path.exists():
+        with np.load(cache_path, allow_pickle=False) as cache:
+            if str(cache["key"]) == cache_key:
+                return _build_frames(glucose_time=cache["glucose_time"], glucose_value=cache["glucose_value"],
+                                     insulin_time=cache["insulin_time"],
+                                     insulin_type=cache["insulin_type"].astype(object),
+                                     insulin_value=cache["insulin_value"])
+
+    glucose, insulin = get_glucose_and_insulin_data(file_name=file_name, chunk_size=chunk_size)
+
+    # Write to a temporary file first so an interrupted run never leaves a corrupted cache behind
+    temp_path = cache_path.with_name(cache_path.name + ".tmp")
+    with open(temp_path, "wb") as file:
+        np.savez(file, key=np.array(cache_key),
+                 glucose_time=glucose['Timestamp'].to_numpy(dtype='datetime64[ns]'),
+                 glucose_value=glucose[GLUCOSE_COLUMN].to_numpy(dtype='float64'),
+                 insulin_time=insulin['Timestamp'].to_numpy(dtype='datetime64[ns]'),
+                 insulin_type=np.array(insulin['Type'].tolist(), dtype=str),
+                 insulin_value=insulin['Value'].to_numpy(dtype='float64'))
+    temp_path.replace(cache_path)
+
+    return glucose, insulin
+
+
+def _get_cache_key(file_path: Path) -> str:
+    """
+    Returns the key of the cache for a file- the preprocessing version and the hash of the file content
+    """
+    digest = hashlib.blake2b(digest_size=16)
+
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+
+    return f"{PREPROCESSING_VERSION}-{digest.hexdigest()}"
+
+
+def _build_frames(glucose_time: np.ndarray, glucose_value: np.ndarray, insulin_time: np.ndarray,
+                  insulin_type: np.ndarray, insulin_value: np.ndarray) -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Build the glucose and insulin frames from their cleaned column arrays.
+
+    Returns:
+        (glucose, insulin): tuple of preprocessed Pandas DataFrames
+    """
+    glucose = pd.DataFrame({'Timestamp': glucose_time, GLUCOSE_COLUMN: glucose_value})
+    insulin = pd.DataFrame({'Timestamp': insulin_time, 'Type': insulin_type, 'Value': insulin_value})
+
+    return glucose, insulin
+
+
+def _split_glucose_and_insulin(df: pd.DataFrame) -> t.Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Parse the timestamp column of a frame holding the used columns and split it into the glucose and insulin frames.
+
+    Args:
+        df: A Pandas DataFrame with the columns of USED_COLUMNS_DTYPES, read as text
+
+    Returns:
+        (glucose, insulin): tuple of preprocessed Pandas DataFrames
+    """
+    # Parse the shared timestamp column once for both frames
+    df[TIMESTAMP_COLUMN] = pd.to_datetime(df[TIMESTAMP_COLUMN], format=TIMESTAMP_FORMAT)
+
+    glucose = _preprocess_glucose_data(df=df)
+    insulin = _preprocess_insulin_data(df=df)
+
+    return glucose, insulin
 
 
 def get_insulin_data(file_name: str) -> pd.DataFrame:
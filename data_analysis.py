@@ -4,7 +4,14 @@ Module for graphical analysis of the ripple
 import math
 import typing as t
 
+import numpy as np
+
+from coefficient_index import CoefficientIndex
+from connection_matrix import ConnectionMatrix
+from dtw import BAND_RATIO, DTWGraphs, find_dtw_connections
 from ripple import Ripple
+from similarity import (AlignedGraphs, CandidateIndex, find_connection_matrix, find_pair_connections, merge_connections,
+                        min_close_count)
 
 
 class Analyze:
@@ -14,28 +21,67 @@ class Analyze:
 
     def __init__(self, ripple_list: t.List[Ripple]):
         self.ripple_list = ripple_list
+        # the number of pairs compared and skipped by the last compare_graphs()
+        self.pair_report = {}
 
-    def _compare_ripple_items(self, ripple1: Ripple, ripple2: Ripple) -> t.Tuple[float, float]:
+    def _compare_ripple_items(self, ripple1: Ripple, ripple2: Ripple, min_percent: float = 0.0) \
+            -> t.Tuple[float, float]:
         """
         Compare two Ripple items and return their percentages of close values.
 
         Args:
             ripple1/ripple2: Ripple objects
+            min_percent: the min percentage for both ripples- a pair below it returns 0, 0 and its comparison
+                        stops as soon as it can no longer reach it
         
         Returns:
             tuple:
             percent_ripple1,percent_ripple2: float representing the percent value of the number of values 
                                             extracted in comparison and the total length of the graph
         """
-        common_interval, close_value_count = self._compare_two_graphs(ripple1, ripple2)
+        min_count = self._get_min_count(ripple1, ripple2, min_percent)
+        common_interval, close_value_count = self._compare_two_graphs(ripple1, ripple2, min_count=min_count)
 
-        if close_value_count != 0:
+        if close_value_count != 0 and close_value_count >= min_count:
             percent_ripple1 = round(close_value_count / len(ripple1.normalized_graph), 2)
             percent_ripple2 = round(close_value_count / len(ripple2.normalized_graph), 2)
             #so here we need to return just the percentage ripple1 is similar to ripple2 and viceversa
             return percent_ripple1, percent_ripple2
         return 0, 0
 
+    @staticmethod
+    def _get_min_count(ripple1: Ripple, ripple2: Ripple, min_percent: float) -> int:
+        """
+        Returns the min number of close values for the percentages of both ripples to reach min_percent, 0 if
+        there is no min percent
+        """
+        if min_percent <= 0:
+            return 0
+
+        lengths = np.array([len(ripple1.normalized_graph), len(ripple2.normalized_graph)])
+        return int(min_close_count(lengths, min_percent).max())
+
+    def is_similar(self, index1: int, index2: int, min_percent: float) -> bool:
+        """
+        Method that checks if two ripples of ripple_list are connected with at least min_percent for both of
+        them. The comparison stops as soon as the answer is known.
+
+        Args:
+            index1/index2: int, positions of the ripples in the ripple list
+            min_percent: the min percentage for both ripples
+
+        Returns:
+            True if both percentages of the pair reach min_percent
+        """
+        ripple1 = self.ripple_list[index1]
+        ripple2 = self.ripple_list[index2]
+        min_count = max(self._get_min_count(ripple1, ripple2, min_percent), 1)
+
+        common_interval, close_value_count = self._compare_two_graphs(ripple1, ripple2, min_count=min_count,
+                                                                      stop_when_reached=True)
+
+        return close_value_count >= min_count
+
     def _create_list_ripple_pairs(self, index1: int, ripple1: Ripple, index2: int, ripple2: Ripple,
                               connections: t.List[t.List[t.Tuple[float, int, int]]]) -> None:
         """
@@ -53,40 +99,137 @@ class Analyze:
             connections[index1].append((percent_ripple1, index1, index2))
             connections[index2].append((percent_ripple2, index2, index1))
 
-    def compare_graphs(self) -> t.List[t.List[t.Tuple[float, int, int]]]:
+    def compare_graphs(self, first_new_index: int = 0, min_percent: float = 0.0, top_k: t.Optional[int] = None,
+                       workers: t.Optional[int] = None) -> t.List[t.List[t.Tuple[float, int, int]]]:
         """
         Method that compares two graphs by taking each graph and comparing it to all the other graphs in the
         ripple_list. It returns a list [with as many lists as there are elements in ripple_list[each of which contain
         a list of tuples(percentage, origin and comparison) that have not null values]]
 
+        Args:
+            first_new_index: index of the first ripple that was not compared yet- only the pairs that contain
+                            at least one ripple from this index on are compared. 0 compares all the pairs
+            min_percent: the min percentage of a connection, for both ripples of the pair. The pairs that can not
+                        reach it are skipped- see pair_report. 0 keeps all the connections
+            top_k: the max number of connections kept per ripple- the best ones, so the last one is still the best
+                match. None keeps all of them
+            workers: the number of processes that compare the pairs- the connections are the same for any number.
+                    None compares them in this process
+
         Returns:
             connections: the list of lists of tuples(float, int, int)
         """
-        # Initialize connections list with empty lists.
-        connections = [[] for _ in self.ripple_list]
+        return self.compare_graphs_sparse(first_new_index=first_new_index, min_percent=min_percent, top_k=top_k,
+                                          workers=workers).to_lists()
+
+    def compare_graphs_sparse(self, first_new_index: int = 0, min_percent: float = 0.0,
+                              top_k: t.Optional[int] = None, workers: t.Optional[int] = None) -> ConnectionMatrix:
+        """
+        Method that compares the graphs like compare_graphs() and returns the connections as a sparse
+        ConnectionMatrix, which takes a lot less memory than the lists of tuples and can be saved to a file.
 
-        # Generate all unique pairs of indices in ripple_list.
-        pairs = [(i, j) for i in range(len(self.ripple_list)) for j in range(i + 1, len(self.ripple_list))]
+        Args:
+            first_new_index/min_percent/top_k/workers: see compare_graphs()
+
+        Returns:
+            the ConnectionMatrix of the connections
+        """
+        # All the pairs are compared at once on the graphs aligned by their max- it gives the same connections
+        # as _create_list_ripple_pairs() for every pair.
+        graphs = AlignedGraphs(self.ripple_list)
+        index = CandidateIndex(graphs, min_percent=min_percent)
 
-        # Iterate through each unique pair of indices and compare the corresponding Ripple items.
-        for index1, index2 in pairs:
-            self._create_list_ripple_pairs(index1, self.ripple_list[index1], index2, self.ripple_list[index2], connections)
+        matrix = find_connection_matrix(graphs, first_new_index=first_new_index, min_percent=min_percent,
+                                        index=index, top_k=top_k, workers=workers)
+        self.pair_report = index.report()
 
-        # Sort each list of tuples in connections.
-        for item in connections:
-            item.sort()
+        return matrix
 
-        return connections
+    def compare_graphs_nearest(self, candidates: int = 20, min_percent: float = 0.0,
+                               top_k: t.Optional[int] = None) -> ConnectionMatrix:
+        """
+        Method that compares every graph only with the candidates nearest to it in the space of the fitted
+        equations, see CoefficientIndex. It is experimental: the connections that are not among the candidates are
+        missed- see coefficient_index.recall_report() for how many of them- and it is only faster than
+        compare_graphs_sparse() with few candidates. With min_percent set, compare_graphs_sparse() skips most
+        pairs by itself and the nearest candidates can take longer.
+
+        Args:
+            candidates: the number of nearest ripples compared with each ripple
+            min_percent/top_k: see compare_graphs()
+
+        Returns:
+            the ConnectionMatrix of the connections
+        """
+        index = CoefficientIndex(self.ripple_list)
+        index1, index2 = index.candidate_pairs(candidates)
+        matrix = find_pair_connections(index.graphs, index1, index2, min_percent=min_percent, top_k=top_k)
+
+        compared_pairs = len(np.unique(np.minimum(index1, index2) * len(self.ripple_list) + np.maximum(index1, index2)))
+        all_pairs = len(self.ripple_list) * (len(self.ripple_list) - 1) // 2
+        self.pair_report = {"compared pairs": compared_pairs, "skipped pairs": all_pairs - compared_pairs}
+
+        return matrix
+
+    def compare_graphs_dtw(self, min_similarity: float = 0.9, band_ratio: float = BAND_RATIO,
+                           top_k: t.Optional[int] = None) -> ConnectionMatrix:
+        """
+        Method that compares the graphs with dynamic time warping instead of value by value after the max, so
+        ripples that are slightly stretched in time still match- see dtw.find_dtw_connections(). The pair_report
+        has the number of pairs rejected by each lower bound and the pruning rate.
+
+        Args:
+            min_similarity: the min similarity of a connection, from 0 to 1
+            band_ratio: the half width of the Sakoe-Chiba band, as a fraction of the resampled graphs
+            top_k: see compare_graphs()
+
+        Returns:
+            the ConnectionMatrix of the connections, with the similarities as scores
+        """
+        graphs = DTWGraphs(self.ripple_list, band_ratio=band_ratio)
+        matrix, self.pair_report = find_dtw_connections(graphs, min_similarity=min_similarity, top_k=top_k)
+
+        return matrix
+
+    def update_connections(self, connections: t.List[t.List[t.Tuple[float, int, int]]], min_percent: float = 0.0,
+                           top_k: t.Optional[int] = None, workers: t.Optional[int] = None) \
+            -> t.List[t.List[t.Tuple[float, int, int]]]:
+        """
+        Method for the ripples appended to ripple_list after the ones the connections were computed for. Only the
+        pairs with a new ripple (new-old and new-new) are compared, so the cost of an update grows with the number
+        of ripples, not with the number of pairs. Their connections are merged into the given ones.
+
+        Args:
+            connections: the connections of the first len(connections) ripples of ripple_list, as returned by
+                        compare_graphs()- changed in place to hold the connections of all the ripples
+            min_percent/top_k/workers: see compare_graphs()- the same as for the connections that are updated
+
+        Returns:
+            new_connections: the connections of the compared pairs only, as returned by compare_graphs()- the
+                            ones to be added to the stored connections
+        """
+        new_connections = self.compare_graphs(first_new_index=len(connections), min_percent=min_percent,
+                                              top_k=top_k, workers=workers)
+        merge_connections(connections, new_connections, top_k=top_k)
+
+        return new_connections
 
     @staticmethod
-    def _compare_two_graphs(ripple_a: Ripple, ripple_b: Ripple) -> t.Tuple[int, int]:
+    def _compare_two_graphs(ripple_a: Ripple, ripple_b: Ripple, min_count: int = 0,
+                            stop_when_reached: bool = False) -> t.Tuple[int, int]:
         """
         Method that returns comparison of two graphs going by value. It determines the common interval between the
         graphs starting from the max in normalized form. Then it returns a tuple having (total length compared,
         number of items in that comparison that are relatively close in value to each other)
 
+        With a min_count, the comparison stops as soon as the rest of the interval can no longer bring the number
+        of close items to it- the number returned is then below min_count, but not the full count. With
+        stop_when_reached it also stops as soon as min_count is reached.
+
         Args:
             ripple_a/ripple_b: Ripple objects to be compared
+            min_count: the number of close items the caller is looking for. 0 compares the whole interval
+            stop_when_reached: if True, the comparison stops when min_count close items are found
         
         Returns:
             a tuple composed of:
@@ -209,4 +352,11 @@ class Analyze:
         for x in range(len(compare_a)):
             sum_of_elements += int(math.isclose(compare_a[x], compare_b[x], rel_tol=0.05))
 
+            if min_count:
+                #even if all the items left are close, min_count is not reached
+                if sum_of_elements + len(compare_a) - x - 1 < min_count:
+                    break
+                if stop_when_reached and sum_of_elements >= min_count:
+                    break
+
         return len(compare_a), sum_of_elements
\ No newline at end of file
@@ -4,11 +4,13 @@ Data division method- it takes the raw values from the Dataframe and splits it i
 
 import copy
 import typing as t
+import numpy as np
 import pandas as pd
 
 from datetime import datetime
 
-from ripple import Ripple
+from ripple import Ripple, RIPPLE_SEQUENCE_ATTRIBUTES
+from ripple_store import RippleStore
 from data_statistic import Ripple_stats
 
 
@@ -32,23 +34,13 @@ class Divide:
         By storing the difference between those two, we have negative and positive values, which is the trend.
         """
 
-        # Initialize an empty list to store the trends
-        temp_trend_list = []
+        # Take the glucose values as integers, all at once
+        glucose_values = self.glucose.iloc[:, 1].to_numpy().astype(int)
 
-        # Iterate through each glucose value from the beginning to the second to last value
-        for k in range(0, len(self.glucose) - 1):
-            # Get the current glucose value (a_n) and convert it to an integer
-            a_n = int(self.glucose.iloc[k, 1].astype(int))
-            # Get the next glucose value (a_n_1) and convert it to an integer
-            a_n_1 = int(self.glucose.iloc[k + 1, 1].astype(int))
-
-            # Check if the current glucose value is equal to the next glucose value
-            if a_n == a_n_1:
-                # If they are equal, append 0 to the temp_trend_list
-                temp_trend_list.append(0.0)
-            else:
-                # If they are not equal, append the difference between the next and current glucose value
-                temp_trend_list.append(a_n_1 - a_n)
+        # The difference between the next and the current glucose value, for every value but the last.
+        # Equal values are stored as 0.0, the same as the value appended for the last glucose value
+        temp_trend_list = [difference if difference != 0 else 0.0
+                           for difference in np.diff(glucose_values).tolist()]
 
         # Append 0 to the temp_trend_list for the last glucose value
         temp_trend_list.append(0.0)
@@ -57,6 +49,23 @@ class Divide:
         return temp_trend_list
 
     def parting(self, trend_list: t.List[int], threshold: int) -> t.List[int]:
+        """
+        Method that divides the values based on trend that changes sign. See parting_with_state().
+
+        Args:
+            trend_list: the list with trends for every value
+            threshold: value that is the min difference to be considered a different value
+
+        Returns:
+            trend_list_count: a list that has at every index the number of elements 
+                            to be included in the future iterables in Ripples
+        """
+        trend_list_count, cut_states = self.parting_with_state(trend_list, threshold)
+
+        return trend_list_count
+
+    def parting_with_state(self, trend_list: t.List[int], threshold: int, positive_trend_prev: float = 0,
+                           negative_trend_prev: float = 0) -> t.Tuple[t.List[int], t.List[t.Tuple[float, float]]]:
 
         """
         Method that divides the values based on trend that changes sign- 
@@ -65,17 +74,24 @@ class Divide:
         with sign to know if it increases or decreases) and a threshold, a limit of variation to consider as a change. Basically 
         the minimum value increment for a change min values to consider a change.
 
+        After every partition all the counters are reset, except the previous trend averages, so the division can be
+        resumed from any partition by passing the previous trend averages recorded at it.
+
         Args:
             trend_list: the list with trends for every value
             threshold: value that is the min difference to be considered a different value
+            positive_trend_prev/negative_trend_prev: the previous trend averages to resume a division with
 
         Returns:
             trend_list_count: a list that has at every index the number of elements 
                             to be included in the future iterables in Ripples
+            cut_states: a list that has at every index the previous trend averages (positive, negative)
+                        recorded right after the partition
         
         """
         #the list that is going to be an output- list of items that represent the number of elements in a ripple
         trend_list_count = []
+        cut_states = []
 
         #keeps track of the number that is going to be inserted in the list
         count = 0
@@ -93,10 +109,6 @@ class Divide:
         positive_trend = 0
         negative_trend = 0
 
-        #previous values of trends
-        positive_trend_prev = 0
-        negative_trend_prev = 0
-
         while k < len(self.glucose):
 
             #starts with the first trend in the list
@@ -168,13 +180,128 @@ class Divide:
                 positive_trend_prev = positive_trend
                 negative_trend_prev = negative_trend
 
+                #a partition was made- record the state the division can be resumed from
+                if count == 0:
+                    cut_states.append((positive_trend_prev, negative_trend_prev))
+
                 positive_trend = 0
                 negative_trend = 0
 
             if k == len(self.glucose) - 1:
                 k += 1
 
-        return trend_list_count
+        return trend_list_count, cut_states
+
+    def parting_by_runs(self, trend_list: t.List[int], threshold: int, positive_trend_prev: float = 0,
+                        negative_trend_prev: float = 0) -> t.Tuple[t.List[int], t.List[t.Tuple[float, float]]]:
+        """
+        Method that divides the values the same way as parting_with_state(), but works over the runs of trends with
+        the same sign instead of over every value. Every pass of the outer loop in parting_with_state() consumes
+        exactly one such run, so the runs are encoded first (start, length, sum of trends) and the rules of the
+        division are applied once per run.
+
+        Args:
+            trend_list: the list with trends for every value
+            threshold: value that is the min difference to be considered a different value
+            positive_trend_prev/negative_trend_prev: the previous trend averages to resume a division with
+
+        Returns:
+            trend_list_count: a list that has at every index the number of elements 
+                            to be included in the future iterables in Ripples
+            cut_states: a list that has at every index the previous trend averages (positive, negative)
+                        recorded right after the partition
+        """
+        trend_list_count = []
+        cut_states = []
+
+        # the last trend is never part of a run
+        trends = np.asarray(trend_list[:len(trend_list) - 1], dtype=float)
+        if len(trends) == 0:
+            return trend_list_count, cut_states
+
+        run_starts, run_lengths, run_sums, run_is_negative = self._run_length_encode(trends)
+
+        count = 0
+        count_positive = 0
+        count_negative = 0
+        switch = 0
+        positive_trend = 0
+        negative_trend = 0
+
+        for start, length, run_sum, is_negative in zip(run_starts.tolist(), run_lengths.tolist(), run_sums.tolist(),
+                                                      run_is_negative.tolist()):
+            if not is_negative:
+                count_positive += length
+                positive_trend = self._add_run(positive_trend, run_sum, trend_list[start:start + length])
+                positive_trend = positive_trend / count_positive
+            else:
+                count_negative += length
+                negative_trend = self._add_run(negative_trend, run_sum, trend_list[start:start + length])
+                negative_trend = negative_trend / count_negative
+                negative_trend = negative_trend * (-1)
+
+            count += length
+            switch += 1
+
+            # the same partition rules as in parting_with_state()
+            if switch >= 2 and count > 50:
+                count_positive = 0
+                count_negative = 0
+
+                if (positive_trend >= threshold and
+                    negative_trend >= threshold) or (positive_trend_prev >= threshold and
+                                                     negative_trend >= threshold) or (positive_trend >= threshold and
+                                                                                      negative_trend_prev >= threshold):
+                    trend_list_count.append(count)
+                    count = 0
+                    switch = 0
+
+                positive_trend_prev = positive_trend
+                negative_trend_prev = negative_trend
+
+                if count == 0:
+                    cut_states.append((positive_trend_prev, negative_trend_prev))
+
+                positive_trend = 0
+                negative_trend = 0
+
+        return trend_list_count, cut_states
+
+    @staticmethod
+    def _run_length_encode(trends: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Method that splits the trends into runs of the same sign- negative or not negative.
+
+        Args:
+            trends: a non empty float array of trends
+
+        Returns:
+            (run_starts, run_lengths, run_sums, run_is_negative): arrays with the start index, the number of
+                                                                elements, the sum of trends and the sign of each run
+        """
+        is_negative = trends < 0
+
+        run_starts = np.concatenate(([0], np.flatnonzero(is_negative[1:] != is_negative[:-1]) + 1))
+        run_lengths = np.diff(np.append(run_starts, len(trends)))
+        # the trends are whole numbers, so the sums are exact
+        run_sums = np.add.reduceat(trends, run_starts)
+
+        return run_starts, run_lengths, run_sums, is_negative[run_starts]
+
+    @staticmethod
+    def _add_run(trend_sum: float, run_sum: float, run: t.List[int]) -> float:
+        """
+        Method that adds the trends of a run to a trend sum, with the same result as adding them one by one.
+        Adding whole numbers is exact, so the run sum is used unless the trend sum is a fraction left
+        from a previous average.
+        """
+        if float(trend_sum).is_integer():
+            return trend_sum + run_sum
+
+        for item in run:
+            trend_sum += item
+
+        return trend_sum
 
     def generate_ripples(self, trend_list: t.List[int], trend_list_count: t.List[int]) -> t.List[Ripple]:
         """
@@ -208,6 +335,20 @@ class Divide:
 
         return ripple_list
 
+    def generate_ripple_store(self, trend_list: t.List[int], trend_list_count: t.List[int]) -> RippleStore:
+        """
+        Method that stores all the ripples in one RippleStore, the array backed alternative of generate_ripples().
+        The ripples are accessed as views with RippleStore.ripples().
+
+        Args:
+            trend_list:the list with trends for each value
+            trend_list_count:the list with number of elements per index
+
+        Returns:
+            a RippleStore of all the ripples
+        """
+        return RippleStore(glucose=self.glucose, trend_list=trend_list, trend_list_count=trend_list_count)
+
     def _create_ripple(self, j: int, x: int, trend_list: t.List[int]) -> Ripple:
 
         r_temp = Ripple()
@@ -236,23 +377,11 @@ class Divide:
         """
 
         # Create a deep copy of the original data dictionary to preserve input data.
-        data_dict = copy.deepcopy(dict(vars(data)))
-
-        # Initialize dictionaries to store iterable and non-iterable items.
-        data_iter = {}
-        data_noniter = {}
-
-        # Iterate through the keys of the data dictionary.
-        for item in data_dict.keys():
-            try:
-                # Check if the item is iterable.
-                iter(data_dict[item])
-            except TypeError:
-                # If not iterable, add the item to the non-iterable dictionary.
-                data_noniter[item] = data_dict[item]
-            else:
-                # If iterable, add the item to the iterable dictionary.
-                data_iter[item] = data_dict[item]
+        data_dict = copy.deepcopy(data.as_dict())
+
+        # The attributes with one value per glucose reading are the iterable ones, as listed by the ripple module.
+        data_iter = {name: data_dict[name] for name in RIPPLE_SEQUENCE_ATTRIBUTES}
+        data_noniter = {name: value for name, value in data_dict.items() if name not in RIPPLE_SEQUENCE_ATTRIBUTES}
 
         return data_iter, data_noniter
 
@@ -267,53 +396,67 @@ class Divide:
         Return:
             insulin_storage= list of list of tuple containing the timestamp, type(str) and dosage(float) of insulin
         """
-        insulin_storage = []
-        i = 0
+        offsets = self._insulin_offsets(ripple_list)
+        insulin_rows = list(zip(*self._insulin_columns()))
+
+        return [insulin_rows[offsets[k]:offsets[k + 1]] for k in range(len(ripple_list))]
+
+    def _split_insulin_by_ripple_and_type(self, ripple_list: t.List[Ripple]) \
+            -> t.Tuple[t.List[t.List[t.Tuple[datetime, str, float]]], t.List[t.List[t.Tuple[datetime, str, float]]]]:
+        """
+        Method that splits the insulin dataframe stored per ripple, as _split_insulin_by_ripple(), and each ripple's
+        insulin into Long-Acting and Fast-Acting insulin. Anything that is not Fast-Acting is counted as slow.
+
+        Args:
+            ripple_list: the list of ripple objects
+
+        Returns:
+            (slow_insulin_list, fast_insulin_list): tuple of lists with, for every ripple, the list of tuples
+                                                    (timestamp, type, dosage) of slow/fast acting insulin
+        """
+        offsets = self._insulin_offsets(ripple_list)
+        times, types, values = self._insulin_columns()
+        is_fast = np.asarray(types, dtype=object) == "Fast-Acting"
 
-        # Iterate through the elements in the ripple_list.
-        for elem in ripple_list:
-            insulin_list = []
+        insulin_by_type = []
+        for positions in (np.flatnonzero(~is_fast), np.flatnonzero(is_fast)):
+            # the positions are ordered, so the ones of each ripple are between the bounds found by binary search
+            bounds = np.searchsorted(positions, offsets).tolist()
+            rows = [(times[k], types[k], values[k]) for k in positions.tolist()]
+            insulin_by_type.append([rows[bounds[k]:bounds[k + 1]] for k in range(len(ripple_list))])
 
-            # Loop until the insulin timestamp is less than or equal to the ripple end time or reaches the end of the
-            # dataframe.
-            while i < len(self.insulin) and self.insulin.iloc[i, 0] <= elem.end_t:
-                # Append the insulin data as a tuple to the insulin_list.
-                insulin_list.append(tuple(self.insulin.iloc[i, 0:3]))
+        slow_insulin_list, fast_insulin_list = insulin_by_type
 
-                # Increment the index to process the next insulin record.
-                i += 1
+        return slow_insulin_list, fast_insulin_list
 
-            # Add the insulin_list to insulin_storage.
-            insulin_storage.append(insulin_list)
+    def _insulin_offsets(self, ripple_list: t.List[Ripple]) -> t.List[int]:
+        """
+        Method that finds which insulin records belong to which ripple- every record up to the end of a ripple
+        that was not taken by a previous ripple. The binary search over the running max of the timestamps
+        gives the same result as walking the records one by one, even when they are out of order.
 
-        return insulin_storage
-    
-    @staticmethod
-    def _divide_by_fast_or_slow_insulin(single_ripple_insulin:t.List[t.Tuple[datetime, str, float]] ) -> t.Tuple[t.List, t.List]:
-            """
-            Method that splits any given single ripple insulin list
-            into separate list for Fast-Acting and Long-Acting insulin
+        Args:
+            ripple_list: the list of ripple objects
 
-            Args:
-                single_ripple_insulin= list of tuples of single ripple
-            
-            Returns:
-                (slow_insulin_seq,fast_insulin_seq): tuple of lists containing the previous list split into fast and slow acting insulin
+        Returns:
+            offsets: list of n+1 positions- the insulin records of ripple k are between offsets[k] and offsets[k+1]
+        """
+        if len(self.insulin) == 0 or not ripple_list:
+            return [0] * (len(ripple_list) + 1)
 
-            """
+        insulin_times = np.maximum.accumulate(self.insulin.iloc[:, 0].to_numpy(dtype='datetime64[ns]'))
+        end_times = np.maximum.accumulate(np.array([elem.end_t for elem in ripple_list], dtype='datetime64[ns]'))
 
-            # Initialize lists to store fast acting and slow acting items.
-            slow_insulin_seq=[]
-            fast_insulin_seq=[]
+        return [0] + np.searchsorted(insulin_times, end_times, side='right').tolist()
 
-            # Iterate through the list
-            for item in single_ripple_insulin:
-                if item[1] == "Fast-Acting":
-                    fast_insulin_seq.append(item)
-                else:
-                    slow_insulin_seq.append(item)
+    def _insulin_columns(self) -> t.Tuple[t.List[datetime], t.List[str], t.List[float]]:
+        """
+        Returns the timestamps, the types and the dosages of the insulin dataframe stored, as lists
+        """
+        if len(self.insulin) == 0:
+            return [], [], []
 
-            return  slow_insulin_seq, fast_insulin_seq
+        return self.insulin.iloc[:, 0].tolist(), self.insulin.iloc[:, 1].tolist(), self.insulin.iloc[:, 2].tolist()
     
     def generate_ripple_statistics(self, ripple_list: t.List[Ripple], 
                                    ripple_connections: t.List[t.List[t.Tuple[float, int, int]]]) -> t.List[Ripple_stats]:
@@ -330,10 +473,11 @@ class Divide:
             ripple_stat_list: list of ripple_stats object
         """
 
-        insulin_list=self._split_insulin_by_ripple(ripple_list)
+        slow_insulin_list, fast_insulin_list = self._split_insulin_by_ripple_and_type(ripple_list)
 
         ripple_stats_list=[
-            self._create_ripple_stats(index=i,ripple_list=ripple_list, ripple_connections=ripple_connections,insulin_list=insulin_list)
+            self._create_ripple_stats(index=i,ripple_list=ripple_list, ripple_connections=ripple_connections,
+                                      slow_insulin_seq=slow_insulin_list[i], fast_insulin_seq=fast_insulin_list[i])
             for i in range(len(ripple_list)) 
         ]
 
@@ -341,14 +485,172 @@ class Divide:
 
     def _create_ripple_stats(self, index: int, ripple_list: t.List[Ripple], 
                              ripple_connections: t.List[t.List[t.Tuple[float, int, int]]], 
-                             insulin_list:t.List[t.List[t.Tuple[datetime, str, float]]]) -> Ripple_stats:
+                             slow_insulin_seq:t.List[t.Tuple[datetime, str, float]],
+                             fast_insulin_seq:t.List[t.Tuple[datetime, str, float]]) -> Ripple_stats:
         
         r_stat_temp= Ripple_stats(ripple_list[index])
-
-        slow_insulin_seq, fast_insulin_seq=self._divide_by_fast_or_slow_insulin(insulin_list[index])
     
         r_stat_temp.add_values(index=index, slow_insulin_seq=slow_insulin_seq, 
                                fast_insulin_seq=fast_insulin_seq,ripple_connections=ripple_connections)
 
         return r_stat_temp
-        
\ No newline at end of file
+        
+
+class StreamingDivide:
+    """
+    Class that divides glucose readings into ripples as they arrive, one by one or in small batches, with the same
+    rules as Divide.parting_with_state(). The state of the division is kept between calls and only the readings
+    of the ripple that is still open are stored, so every reading costs O(1) amortized work.
+
+    A run of trends with the same sign is finished only when a trend of the other sign arrives, so a ripple is
+    returned once the first trend after it is known- the same ripples Divide returns for the readings received
+    so far, except the one cut only because the data ended.
+    """
+
+    def __init__(self, threshold: int = 1, positive_trend_prev: float = 0, negative_trend_prev: float = 0):
+        self.threshold = threshold
+
+        #previous trend averages, the only values kept from one partition to the next
+        self.positive_trend_prev = positive_trend_prev
+        self.negative_trend_prev = negative_trend_prev
+
+        #counters of the division, as in Divide.parting_with_state()
+        self._count = 0
+        self._count_positive = 0
+        self._count_negative = 0
+        self._switch = 0
+        self._positive_trend = 0
+        self._negative_trend = 0
+
+        #sign of the run being counted, None before the first trend
+        self._run_is_negative = None
+
+        #readings of the open ripple- the trend of the last reading is not known until the next one arrives
+        self._time_v = []
+        self._bg = []
+        self._trend_v = []
+
+    def add_reading(self, timestamp: datetime, value: float) -> t.List[Ripple]:
+        """
+        Method that receives one glucose reading.
+
+        Args:
+            timestamp: the time of the reading
+            value: the glucose value of the reading
+
+        Returns:
+            a list with the ripple finished by this reading, or an empty list
+        """
+        finished = []
+
+        if self._bg:
+            #the trend of the previous reading is now known, the same way as in Divide.trend_setting()
+            difference = int(value) - int(self._bg[-1])
+            trend = difference if difference != 0 else 0.0
+            self._trend_v.append(trend)
+
+            ripple = self._add_trend(trend)
+            if ripple is not None:
+                finished.append(ripple)
+
+        self._time_v.append(timestamp)
+        self._bg.append(value)
+
+        return finished
+
+    def add_readings(self, glucose: pd.DataFrame) -> t.List[Ripple]:
+        """
+        Method that receives a batch of glucose readings.
+
+        Args:
+            glucose: dataframe with the timestamps in the first column and the glucose values in the second
+
+        Returns:
+            ripple_list: the list of ripples finished by these readings
+        """
+        ripple_list = []
+
+        for timestamp, value in zip(glucose.iloc[:, 0], glucose.iloc[:, 1].tolist()):
+            ripple_list.extend(self.add_reading(timestamp, value))
+
+        return ripple_list
+
+    def _add_trend(self, trend: float) -> t.Optional[Ripple]:
+        """
+        Method that counts a trend into the division. When the trend changes the sign, the previous run is
+        finished and the partition rules are checked before the trend is counted.
+
+        Args:
+            trend: the trend of the oldest reading without one
+
+        Returns:
+            the ripple finished by the partition, or None
+        """
+        ripple = None
+        is_negative = trend < 0
+
+        if self._run_is_negative is not None and is_negative != self._run_is_negative:
+            ripple = self._finish_run()
+
+        self._run_is_negative = is_negative
+        self._count += 1
+
+        if is_negative:
+            self._count_negative += 1
+            self._negative_trend += trend
+        else:
+            self._count_positive += 1
+            self._positive_trend += trend
+
+        return ripple
+
+    def _finish_run(self) -> t.Optional[Ripple]:
+        """
+        Method that averages the finished run and applies the partition rules of Divide.parting_with_state()
+
+        Returns:
+            the ripple finished by the partition, or None
+        """
+        if self._run_is_negative:
+            self._negative_trend = self._negative_trend / self._count_negative
+            self._negative_trend = self._negative_trend * (-1)
+        else:
+            self._positive_trend = self._positive_trend / self._count_positive
+
+        self._switch += 1
+
+        if not (self._switch >= 2 and self._count > 50):
+            return None
+
+        ripple = None
+        self._count_positive = 0
+        self._count_negative = 0
+
+        threshold = self.threshold
+        if (self._positive_trend >= threshold and self._negative_trend >= threshold) or \
+                (self.positive_trend_prev >= threshold and self._negative_trend >= threshold) or \
+                (self._positive_trend >= threshold and self.negative_trend_prev >= threshold):
+            ripple = self._create_ripple(self._count)
+            self._count = 0
+            self._switch = 0
+
+        self.positive_trend_prev = self._positive_trend
+        self.negative_trend_prev = self._negative_trend
+
+        self._positive_trend = 0
+        self._negative_trend = 0
+
+        return ripple
+
+    def _create_ripple(self, x: int) -> Ripple:
+        """
+        Method that creates the ripple of the first x stored readings and removes them from the storage
+        """
+        r_temp = Ripple()
+        r_temp.add_values(bg_value=self._bg[:x], time_value=self._time_v[:x], trend_value=self._trend_v[:x])
+
+        del self._bg[:x]
+        del self._time_v[:x]
+        del self._trend_v[:x]
+
+        return r_temp
@@ -6,10 +6,13 @@ from __future__ import annotations
 
 import typing as t
 
+import numpy as np
+
 def convert_to_list(data:dict) -> t.Dict[str,list]:
         for key, value in data.items():
             if type(value)!= list:
-                data[key]=list(value)
+                #arrays are converted to python values, the same as the ones of a pandas Series
+                data[key]=value.tolist() if isinstance(value, np.ndarray) else list(value)
         return data
 def get_name_and_type(data_dict: t.Dict[str, t.List]) -> t.Dict[str, str]:
     """
@@ -28,6 +28,11 @@ def time_in_range(start:datetime.time, end:datetime.time, x:datetime.time) ->boo
             return start <= x or x <= end
 
 
+# the attributes of the statistics of a ripple, in the order they are exported
+RIPPLE_STATS_ATTRIBUTES = ("base_max_t", "base_min_t", "is_ascending", "max_graph_similarity", "duration_category",
+                           "slow_insulin_seq", "slow_time_vs_max", "slow_time_vs_min",
+                           "fast_insulin_seq", "fast_time_vs_max", "fast_time_vs_min")
+
 
 class Ripple_stats:
     """
@@ -38,7 +43,7 @@ class Ripple_stats:
         is_ascending: boolean value showing if the graph is ascending or not (which comes first- the min or the max in the glucose interval)
 
         max_graph_similarity: string converted from tuple using the construction f"{round((percent) * 100)}% -from {position_from}-to {position_to}"
-                            showing the best similarity of the graph
+                            showing the best similarity of the graph, or "-" if it has no connection
 
         duration_category: float value that gives the round number in hour in which that ripple falls into
     
@@ -49,6 +54,8 @@ class Ripple_stats:
      
     """
 
+    __slots__ = RIPPLE_STATS_ATTRIBUTES
+
     def __init__(self, base_ripple:Ripple):
         #about the ripple
         self.base_max_t=base_ripple.max_t
@@ -84,8 +91,12 @@ class Ripple_stats:
             ripple_connections: list of list with the connections and similarity between ripple graphs
         
         """
-        percent, position_from, position_to =ripple_connections[index][-1]
-        self.max_graph_similarity=f"{round((percent) * 100)}% -from {position_from}-to {position_to}"
+        #a ripple may have no connection at all, for example when none of them reaches the min percentage
+        if ripple_connections[index]:
+            percent, position_from, position_to =ripple_connections[index][-1]
+            self.max_graph_similarity=f"{round((percent) * 100)}% -from {position_from}-to {position_to}"
+        else:
+            self.max_graph_similarity="-"
 
         self.slow_insulin_seq=slow_insulin_seq
         if slow_insulin_seq:
@@ -105,7 +116,12 @@ class Ripple_stats:
        
         self._check_insulin_positioning(slow_insulin_exists,fast_insulin_exists)
 
-   
+    def as_dict(self) -> dict:
+        """
+        Method that returns the attributes of the statistics, in the order of RIPPLE_STATS_ATTRIBUTES
+        """
+        return {name: getattr(self, name) for name in RIPPLE_STATS_ATTRIBUTES}
+
     def _check_insulin_positioning(self,slow_insulin_exists:bool,fast_insulin_exists:bool) ->None:
         """
         Method that starts the checking for insulin position in relation to glucose values 
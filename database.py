@@ -109,6 +109,14 @@ class DatabaseManager:
         
         self._execute(statement)
 
+    def table_exists(self, table_name: str) -> bool:
+        """
+        Takes in a table name and returns True if the table is in the database
+        """
+
+        statement = "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?;"
+        return self._execute(statement, (table_name,)).fetchone() is not None
+
     def drop_table(self, table_name: str) -> None:
         """
         Takes in a table name to delete using the DROP TABLE statement to be executed with SQLite
@@ -157,6 +165,36 @@ class DatabaseManager:
         #because the lastrow id will literally return the last- that means not 0 if it is first, but 1
         return (result.lastrowid-1)
 
+    def add_rows(self, table_name: str, column_names: t.List[str], rows: t.Iterable[t.Tuple]) -> None:
+        """
+        Takes in a table name to INSERT data INTO, the names of the columns and the rows as tuples with the values
+        of those columns, and adds all of them in one transaction
+
+        Args:
+            table_name: str -the name of the table where to add
+            column_names: list of the names of the columns, in the order of the values of the rows
+            rows: iterable of tuples, one per row
+        """
+        placeholders = ", ".join(["?"] * len(column_names))
+
+        statement = f"""
+            INSERT INTO
+                {table_name} (
+                    {", ".join(column_names)}
+                ) VALUES (
+                    {placeholders}
+                );
+        """
+
+        try:
+            with self.connection:
+                self.connection.executemany(statement, rows)
+        except (sqlite3.IntegrityError, sqlite3.OperationalError):
+            print(
+                f"Something went wrong with the following transaction:\n{statement}"
+            )
+            raise
+
     def delete(self, table_name: str, criteria: t.Dict[str, str]) -> None:
         """
         Takes in a table name and a criteria to DELETE FROM
@@ -175,6 +213,47 @@ class DatabaseManager:
 
         self._execute(statement, delete_criteria_values)
 
+    def delete_from(self, table_name: str, column: str, first_value: int) -> None:
+        """
+        Takes in a table name, a column and a value and deletes the rows where the column is at least that value.
+        The counter of the ID is set back to the last ID left, so the next rows added get the IDs of the deleted ones
+        """
+
+        try:
+            with self.connection:
+                self.connection.execute(f"DELETE FROM {table_name} WHERE {column} >= ?;", (first_value,))
+                self.connection.execute(f"UPDATE sqlite_sequence SET seq = (SELECT IFNULL(MAX(ID), 0) FROM "
+                                        f"{table_name}) WHERE name = ?;", (table_name,))
+        except (sqlite3.IntegrityError, sqlite3.OperationalError):
+            print(
+                f"Something went wrong with the deletion from {table_name}"
+            )
+            raise
+
+    def select(
+        self,
+        table_name: str,
+        criteria: t.Dict[str, str] = {},
+        order_by: t.Optional[str] = None,
+        ordered_descending: bool = False,
+        ) -> t.List[t.Tuple]:
+        """
+        Takes in a table name and optionally a criteria as a dictionary, a column to order by
+        and a boolean flag to order it by that column descending or not and returns the selected rows
+
+        Args:
+            table_name:str, the table name
+            criteria: dict where keys are column name, value are values that meet the criteria of equality
+            order_by: optional value to sort by
+            ordered_descending:optional value to change the way it is sorted
+
+        Returns:
+            a list of tuples, one per row, with the values of all the columns
+        """
+        statement = self._select_statement(table_name, criteria, order_by, ordered_descending)
+
+        return self._execute(statement, tuple(criteria.values())).fetchall()
+
     def _select_statement(
         self, 
         table_name: str, 
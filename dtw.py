@@ -0,0 +1,225 @@
+"""
+Module for comparing the normalized graphs of the ripples with dynamic time warping (DTW), which also matches ripples
+that are slightly stretched in time. The warping is limited to a Sakoe-Chiba band, and most pairs are rejected by
+lower bounds of the distance (LB_Kim, then LB_Keogh) before the DTW is computed- for whole blocks of pairs at a time
+"""
+
+import math
+import typing as t
+
+import numpy as np
+
+from connection_matrix import ConnectionMatrix, build_connection_matrix
+from ripple import Ripple, round_values
+
+# the number of values every graph is resampled to, so all of them are compared on the same axis
+RESAMPLE_LENGTH = 32
+
+# the half width of the Sakoe-Chiba band, as a fraction of RESAMPLE_LENGTH
+BAND_RATIO = 0.1
+
+# the max ratio of the lengths of two ripples that are compared
+MAX_STRETCH = 1.5
+
+# the part of the pairs of a DTW that have to be above the cutoff for them to be dropped from the arrays
+COMPACT_FRACTION = 0.25
+
+# max number of pairs compared in one block- it bounds the memory used by the comparison
+BLOCK_PAIRS = 100_000
+
+
+class DTWGraphs:
+    """
+    Object that stores the normalized graphs of a list of ripples resampled to the same length, with their LB_Keogh
+    envelopes. (values= float array of shape (ripple count, resample length)| length= int array of the original
+    length of each graph| window= int half width of the band| upper/lower= float arrays with the max and min of the
+    values in the band around every position)
+
+    The similarity of two graphs is 1 - the root mean square of the differences along the best warping path,
+    rounded to 2 decimals like the percentages of Analyze.compare_graphs().
+    """
+
+    def __init__(self, ripple_list: t.List[Ripple], resample_length: int = RESAMPLE_LENGTH,
+                 band_ratio: float = BAND_RATIO):
+        graphs = [np.asarray(ripple.normalized_graph, dtype=np.float64) for ripple in ripple_list]
+        self.length = np.array([len(graph) for graph in graphs], dtype=np.int64)
+        self.window = max(0, math.ceil(band_ratio * resample_length))
+
+        # linear interpolation at resample_length positions from the start to the end of every graph
+        offset = np.cumsum(self.length) - self.length
+        values = np.concatenate(graphs) if graphs else np.empty(0)
+        position = np.linspace(0, 1, resample_length)[None, :] * (self.length[:, None] - 1)
+        before = np.floor(position).astype(np.int64)
+        after = np.minimum(before + 1, self.length[:, None] - 1)
+        fraction = position - before
+        self.values = ((1 - fraction) * values[offset[:, None] + before] + fraction * values[offset[:, None] + after]
+                       ).reshape(len(graphs), resample_length)
+
+        self.upper = self.values.copy()
+        self.lower = self.values.copy()
+        for shift in range(1, self.window + 1):
+            self.upper[:, shift:] = np.maximum(self.upper[:, shift:], self.values[:, :-shift])
+            self.upper[:, :-shift] = np.maximum(self.upper[:, :-shift], self.values[:, shift:])
+            self.lower[:, shift:] = np.minimum(self.lower[:, shift:], self.values[:, :-shift])
+            self.lower[:, :-shift] = np.minimum(self.lower[:, :-shift], self.values[:, shift:])
+
+    def __len__(self) -> int:
+        return len(self.length)
+
+    def lb_kim(self, pair_a: np.ndarray, pair_b: np.ndarray) -> np.ndarray:
+        """
+        Method that returns LB_Kim of the pairs- the first and the last values are always matched with each other
+        """
+        first = (self.values[pair_a, 0] - self.values[pair_b, 0]) ** 2
+        if self.values.shape[1] == 1:
+            return first
+        return first + (self.values[pair_a, -1] - self.values[pair_b, -1]) ** 2
+
+    def lb_keogh(self, pair_a: np.ndarray, pair_b: np.ndarray) -> np.ndarray:
+        """
+        Method that returns LB_Keogh of the pairs- the distance of the values of a to the envelope of b, since every
+        value of a is matched with a value of b inside the band
+        """
+        values = self.values[pair_a]
+        above = np.maximum(values - self.upper[pair_b], 0)
+        below = np.maximum(self.lower[pair_b] - values, 0)
+
+        return (above ** 2 + below ** 2).sum(axis=1)
+
+    def distance(self, pair_a: np.ndarray, pair_b: np.ndarray, cutoff: float = np.inf) -> np.ndarray:
+        """
+        Method that computes the DTW distance of the pairs- the min sum of the squared differences along a warping
+        path inside the band- one row of the cost matrix at a time for all the pairs
+
+        Args:
+            pair_a/pair_b: int arrays with the two ripple indexes of every pair
+            cutoff: the pairs are dropped as soon as all their paths are above it, and get inf
+
+        Returns:
+            float array with the distance of every pair
+        """
+        size = self.values.shape[1]
+        width = 2 * self.window + 1
+        result = np.full(len(pair_a), np.inf)
+        active = np.arange(len(pair_a))
+        # one row per position and one column per pair, so the values of a position are contiguous
+        values_a = np.ascontiguousarray(self.values[pair_a].T)
+        values_b = np.ascontiguousarray(self.values[pair_b].T)
+
+        # only the band of every row of the cost matrix is kept- the cell k of row i is j = i - window + k, and the
+        # extra last cell stays inf for the cells of the previous row that are out of the band
+        previous = np.full((width + 1, len(pair_a)), np.inf)
+
+        for i in range(size):
+            current = np.full((width + 1, len(active)), np.inf)
+
+            for k in range(width):
+                j = i - self.window + k
+                if j < 0 or j >= size:
+                    continue
+
+                cost = (values_a[i] - values_b[j]) ** 2
+                if i == 0 and j == 0:
+                    current[k] = cost
+                    continue
+
+                # (i-1, j) is the cell k+1 of the previous row, (i-1, j-1) the cell k
+                best = np.minimum(previous[k + 1], previous[k])
+                if k > 0:
+                    np.minimum(best, current[k - 1], out=best)
+                np.add(cost, best, out=current[k])
+
+            # the costs only grow along a path, so the pairs above the cutoff are dropped- when there are enough
+            # of them to be worth the copy
+            reachable = current.min(axis=0) <= cutoff
+            if not reachable.any():
+                return result
+            if (~reachable).sum() >= COMPACT_FRACTION * len(active):
+                active = active[reachable]
+                values_a, values_b, current = values_a[:, reachable], values_b[:, reachable], current[:, reachable]
+            previous = current
+
+        distance = previous[self.window]
+        result[active] = np.where(distance <= cutoff, distance, np.inf)
+
+        return result
+
+    def similarity(self, distance: np.ndarray) -> np.ndarray:
+        """Returns the similarity of the given DTW distances, rounded to 2 decimals"""
+        return round_values(1 - np.sqrt(distance / self.values.shape[1]), 2)
+
+    def max_distance(self, min_similarity: float) -> float:
+        """
+        Returns the largest distance that can still round to min_similarity- the pairs with a lower bound above
+        it are not compared
+        """
+        return self.values.shape[1] * max(1 - min_similarity + 0.005, 0) ** 2
+
+
+def find_dtw_connections(graphs: DTWGraphs, min_similarity: float = 0.9, top_k: t.Optional[int] = None) \
+        -> t.Tuple[ConnectionMatrix, t.Dict[str, t.Any]]:
+    """
+    Function that compares all the pairs of graphs with DTW and returns the pairs with a similarity of at least
+    min_similarity, for both ripples. The pairs go through a cascade of cheaper checks first- the ratio of their
+    lengths, LB_Kim, LB_Keogh both ways- and the DTW is only computed for the pairs none of them rejects.
+
+    Args:
+        graphs: the DTWGraphs of the ripples
+        min_similarity: the min similarity of a connection
+        top_k: the max number of connections kept per ripple. None keeps all of them
+
+    Returns:
+        (matrix, report): the ConnectionMatrix of the connections, with the similarity as score, and a dict with
+                        the number of pairs rejected by every step and the pruning rate- the part of the pairs
+                        whose DTW was not computed
+    """
+    ripple_count = len(graphs)
+    cutoff = graphs.max_distance(min_similarity)
+    report = {"pairs": ripple_count * (ripple_count - 1) // 2, "skipped by length": 0, "pruned by LB_Kim": 0,
+              "pruned by LB_Keogh": 0, "dtw computed": 0, "abandoned": 0, "connections": 0}
+
+    origins, comparisons, scores = [], [], []
+    block_rows = max(1, BLOCK_PAIRS // max(ripple_count, 1))
+
+    for row_start in range(0, ripple_count, block_rows):
+        rows = np.arange(row_start, min(row_start + block_rows, ripple_count))
+        pair_a, pair_b = np.nonzero(rows[:, None] < np.arange(ripple_count)[None, :])
+        pair_a = rows[pair_a]
+
+        stretch = (np.maximum(graphs.length[pair_a], graphs.length[pair_b])
+                   <= MAX_STRETCH * np.minimum(graphs.length[pair_a], graphs.length[pair_b]))
+        report["skipped by length"] += int((~stretch).sum())
+        pair_a, pair_b = pair_a[stretch], pair_b[stretch]
+
+        kept = graphs.lb_kim(pair_a, pair_b) <= cutoff
+        report["pruned by LB_Kim"] += int((~kept).sum())
+        pair_a, pair_b = pair_a[kept], pair_b[kept]
+
+        kept = graphs.lb_keogh(pair_a, pair_b) <= cutoff
+        kept[kept] = graphs.lb_keogh(pair_b[kept], pair_a[kept]) <= cutoff
+        report["pruned by LB_Keogh"] += int((~kept).sum())
+        pair_a, pair_b = pair_a[kept], pair_b[kept]
+
+        distance = graphs.distance(pair_a, pair_b, cutoff=cutoff)
+        report["dtw computed"] += len(pair_a)
+        report["abandoned"] += int(np.isinf(distance).sum())
+
+        similarity = graphs.similarity(distance)
+        connected = np.isfinite(distance) & (similarity >= min_similarity) & (similarity > 0)
+        pair_a, pair_b, similarity = pair_a[connected], pair_b[connected], similarity[connected]
+
+        origins += [pair_a, pair_b]
+        comparisons += [pair_b, pair_a]
+        scores += [similarity, similarity]
+        report["connections"] += len(pair_a)
+
+    report["pruning rate"] = round(1 - report["dtw computed"] / report["pairs"], 4) if report["pairs"] else 0.0
+
+    if not origins:
+        matrix = build_connection_matrix(ripple_count, np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32),
+                                         np.empty(0, dtype=np.float32))
+    else:
+        matrix = build_connection_matrix(ripple_count, np.concatenate(origins), np.concatenate(comparisons),
+                                         np.concatenate(scores), top_k=top_k)
+
+    return matrix, report
@@ -0,0 +1,150 @@
+"""
+Module for the incremental ingest- it keeps the state of the data already divided in an export folder,
+so that a newer export, which is a superset of the previous one, only has its new rows processed
+"""
+import typing as t
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_division import Divide
+from ripple import Ripple
+
+STATE_FILE_NAME = "incremental_state.npz"
+
+
+class IngestState:
+    """
+    Object that stores what was already divided into ripples. Only finished ripples are kept, so the values
+    after the last of them (the tail) are divided again together with the new rows.
+    (time_v= datetime array of the values of the finished ripples| bg= float array of glucose values|
+    trend_v= float array of trends| trend_list_count= int array with the number of elements per ripple|
+    positive_trend_prev/negative_trend_prev= previous trend averages of the division at the last partition)
+    """
+
+    def __init__(self):
+        self.time_v = np.empty(0, dtype='datetime64[ns]')
+        self.bg = np.empty(0, dtype='float64')
+        self.trend_v = np.empty(0, dtype='float64')
+        self.trend_list_count = np.empty(0, dtype='int64')
+        self.positive_trend_prev = 0.0
+        self.negative_trend_prev = 0.0
+
+    def glucose(self) -> pd.DataFrame:
+        """Returns the glucose dataframe of the finished ripples, in the format used by Divide"""
+        return pd.DataFrame({'Timestamp': self.time_v, 'Glucose Value (mg/dL)': self.bg})
+
+    def get_unprocessed_rows(self, glucose: pd.DataFrame) -> pd.DataFrame:
+        """
+        Method that returns the glucose rows that are not part of a finished ripple- the tail of the previous
+        export together with the new rows.
+
+        Args:
+            glucose: the glucose dataframe of the whole export
+
+        Returns:
+            the glucose dataframe of the rows newer than the end of the last finished ripple
+        """
+        if len(self.time_v) == 0:
+            return glucose
+
+        last_timestamp = pd.Timestamp(self.time_v[-1])
+
+        return glucose[glucose['Timestamp'] > last_timestamp].reset_index(drop=True)
+
+    def generate_ripples(self) -> t.List[Ripple]:
+        """Returns the list of the finished ripples, generated from the stored values"""
+        divide = Divide(glucose=self.glucose())
+
+        return divide.generate_ripple_store(self.trend_v.tolist(), self.trend_list_count.tolist()).ripples()
+
+    def add_ripples(self, glucose: pd.DataFrame, trend_list: t.List[int], trend_list_count: t.List[int],
+                    cut_states: t.List[t.Tuple[float, float]]) -> None:
+        """
+        Method that records newly finished ripples.
+
+        Args:
+            glucose: the glucose dataframe that was divided, starting with the first value of the first new ripple
+            trend_list: the list with trends for each value of the glucose dataframe
+            trend_list_count: the list with the number of elements of each new ripple
+            cut_states: the previous trend averages recorded at each new partition
+        """
+        processed = sum(trend_list_count)
+
+        self.time_v = np.concatenate([self.time_v, glucose.iloc[:processed, 0].to_numpy(dtype='datetime64[ns]')])
+        self.bg = np.concatenate([self.bg, glucose.iloc[:processed, 1].to_numpy(dtype='float64')])
+        self.trend_v = np.concatenate([self.trend_v, np.asarray(trend_list[:processed], dtype='float64')])
+        self.trend_list_count = np.concatenate([self.trend_list_count,
+                                                np.asarray(trend_list_count, dtype='int64')])
+
+        if cut_states:
+            self.positive_trend_prev, self.negative_trend_prev = cut_states[-1]
+
+    def save(self, path: Path) -> None:
+        """
+        Method that writes the state in the export folder.
+
+        Args:
+            path: the export folder
+        """
+        temp_path = path / (STATE_FILE_NAME + ".tmp")
+
+        with open(temp_path, "wb") as file:
+            np.savez(file, time_v=self.time_v, bg=self.bg, trend_v=self.trend_v,
+                     trend_list_count=self.trend_list_count,
+                     trend_prev=np.array([self.positive_trend_prev, self.negative_trend_prev]))
+
+        temp_path.replace(path / STATE_FILE_NAME)
+
+
+def load_state(path: Path) -> IngestState:
+    """
+    Function that reads the state stored in an export folder
+
+    Args:
+        path: the export folder
+
+    Returns:
+        the stored IngestState, or an empty one if nothing was processed in that folder yet
+    """
+    state = IngestState()
+    state_path = path / STATE_FILE_NAME
+
+    if state_path.exists():
+        with np.load(state_path, allow_pickle=False) as stored:
+            state.time_v = stored["time_v"]
+            state.bg = stored["bg"]
+            state.trend_v = stored["trend_v"]
+            state.trend_list_count = stored["trend_list_count"]
+            state.positive_trend_prev, state.negative_trend_prev = stored["trend_prev"].tolist()
+
+    return state
+
+
+def divide_unprocessed_rows(divide: Divide, threshold: int, state: IngestState) \
+        -> t.Tuple[t.List[int], t.List[int], t.List[t.Tuple[float, float]]]:
+    """
+    Function that divides the unprocessed rows, resuming the division from the state of the last partition.
+    A ripple that was cut only because the data ended is unfinished- it can still grow with the next export-
+    so it is left in the tail.
+
+    Args:
+        divide: a Divide object holding the unprocessed glucose rows
+        threshold: value that is the min difference to be considered a different value
+        state: the IngestState of the export folder
+
+    Returns:
+        (trend_list, trend_list_count, cut_states): the trends of the unprocessed rows, the number of elements
+                                                    and the division state of each finished ripple
+    """
+    trend_list = divide.trend_setting()
+    trend_list_count, cut_states = divide.parting_by_runs(trend_list, threshold, state.positive_trend_prev,
+                                                          state.negative_trend_prev)
+
+    # the last value is never part of a ripple, so a ripple ending right before it was cut by the end of the data
+    if trend_list_count and sum(trend_list_count) == len(trend_list) - 1:
+        trend_list_count = trend_list_count[:-1]
+        cut_states = cut_states[:-1]
+
+    return trend_list, trend_list_count, cut_states
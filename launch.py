@@ -2,7 +2,10 @@
 The main program where everything happens-it obtains the data from a csv imported by the user
 and then generates the summary and the analysis
 """
+import argparse
+import time
 import typing as t
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from copy import deepcopy
 
@@ -10,6 +13,7 @@ import data_acquisition
 import data_display
 import data_reconfig
 import constants
+import incremental
 import pandas as pd
 from data_analysis import Analyze
 from data_division import Divide
@@ -23,12 +27,11 @@ CURRENT_PATH_CWD = Path.cwd()
 test branch
 """
 
-def main():
+def main(min_percent: float = 0.0, top_k: t.Optional[int] = None, workers: t.Optional[int] = None):
 
     file_location = select_file()
 
-    glucose = data_acquisition.get_glucose_data(file_name=file_location)
-    insulin = data_acquisition.get_insulin_data(file_name=file_location)
+    glucose, insulin = data_acquisition.get_cached_glucose_and_insulin_data(file_name=file_location)
     write_a_message("FILE ACQUIRED")
 
     d = Divide(glucose=glucose, insulin=insulin)
@@ -41,8 +44,8 @@ def main():
     trend_list = d.trend_setting()
 
     threshold = 1
-    trend_list_count = d.parting(trend_list, threshold)
-    ripple_list = d.generate_ripples(trend_list, trend_list_count)
+    trend_list_count, cut_states = d.parting_by_runs(trend_list, threshold)
+    ripple_list = d.generate_ripple_store(trend_list, trend_list_count).ripples()
     write_a_message("FILE DIVIDED")
 
     # for no, elem in enumerate( ripple_list):
@@ -57,7 +60,10 @@ def main():
 
     a = Analyze(ripple_list=ripple_list)
     
-    ripple_connections = a.compare_graphs()
+    connection_matrix = a.compare_graphs_sparse(min_percent=min_percent, top_k=top_k, workers=workers)
+    connection_matrix.save(DATA_PATH/(constants.CONNECTIONS_FILE_NAME+start_end+".bin"))
+    ripple_connections = connection_matrix.to_lists()
+    write_a_message(_pair_report_message(a.pair_report))
 
     
 
@@ -76,6 +82,233 @@ def main():
 
 
 
+def main_incremental(min_percent: float = 0.0, top_k: t.Optional[int] = None, workers: t.Optional[int] = None):
+    """
+    Variant of main() for rolling exports of the same patient, where every new export is a superset of the previous
+    one. Only the rows newer than the last finished ripple are divided, and the new ripples, database rows and
+    similarity results are appended to the ones already in the export folder.
+
+    Args:
+        min_percent: the min percentage of a connection between two ripples, see Analyze.compare_graphs()
+        top_k: the max number of connections kept per ripple, see Analyze.compare_graphs()
+        workers: the number of processes that compare the ripples, see Analyze.compare_graphs()
+    """
+
+    file_location = select_file()
+
+    glucose, insulin = data_acquisition.get_cached_glucose_and_insulin_data(file_name=file_location)
+    write_a_message("FILE ACQUIRED")
+
+    #the same folder is used by all the exports that start on the same date
+    start_end = "-" + str(glucose.iloc[0, 0].date()) + "-incremental"
+
+    set_directory(start_end=start_end)
+    global DATA_PATH
+    DATA_PATH = CURRENT_PATH_CWD /"EXPORT"/ start_end
+    DATA_PATH.mkdir(parents=True, exist_ok=True)
+
+    state = incremental.load_state(path=DATA_PATH)
+    old_ripple_list = state.generate_ripples()
+
+    d = Divide(glucose=state.get_unprocessed_rows(glucose=glucose), insulin=insulin)
+
+    threshold = 1
+    trend_list, trend_list_count, cut_states = incremental.divide_unprocessed_rows(divide=d, threshold=threshold,
+                                                                                   state=state)
+    new_ripple_list = d.generate_ripple_store(trend_list, trend_list_count).ripples()
+
+    if not new_ripple_list:
+        write_a_message("NO NEW RIPPLES")
+        return
+
+    ripple_list = old_ripple_list + new_ripple_list
+    write_a_message("FILE DIVIDED")
+
+    #the dataset is rewritten since it holds all the ripples
+    (DATA_PATH/f'dataset{start_end}.xls').unlink(missing_ok=True)
+    _create_dataset_xls(divide=d, ripple_list=ripple_list, path=DATA_PATH, start_end=start_end)
+
+    db = _append_to_basic_database(divide=d, ripple_list=new_ripple_list, path=DATA_PATH, start_end=start_end,
+                                   ripple_count=len(old_ripple_list))
+    write_a_message("BASIC DATABASE UPDATED")
+
+    a = Analyze(ripple_list=ripple_list)
+
+    ripple_connections = _update_analysis_database(analyze=a, ripple_count=len(old_ripple_list), path=DATA_PATH,
+                                                   start_end=start_end, min_percent=min_percent, top_k=top_k,
+                                                   workers=workers)
+    write_a_message(_pair_report_message(a.pair_report))
+    write_a_message("ANALYSIS DATABASE UPDATED")
+
+    _extract_summary_of_analysis(ripple_connections=ripple_connections,start_end=start_end,path=DATA_PATH)
+    write_a_message("SUMMARY OF ANALYSIS CREATED")
+
+    #the state is written last, so an interrupted run is redone from the previous state
+    state.add_ripples(glucose=d.glucose, trend_list=trend_list, trend_list_count=trend_list_count,
+                      cut_states=cut_states)
+    state.save(path=DATA_PATH)
+
+
+def main_batch(source: str, workers: t.Optional[int] = None, min_percent: float = 0.0,
+               top_k: t.Optional[int] = None) -> pd.DataFrame:
+    """
+    Variant of main() for many patients- it runs the acquisition, division, analysis and databases for every
+    csv export in a pool of worker processes, without the graphical interface. Each export is written in its
+    own folder, EXPORT/<name of the csv>/<start_end>, and a timing report of all of them is written in EXPORT.
+
+    Args:
+        source: a directory containing the csv exports, or a manifest- a text file with the path of one csv
+                export per line, relative to the manifest
+        workers: the number of worker processes. None uses one per processor
+        min_percent: the min percentage of a connection between two ripples, see Analyze.compare_graphs()
+        top_k: the max number of connections kept per ripple, see Analyze.compare_graphs()
+
+    Returns:
+        report: a dataframe with the time of each step and the number of compared and skipped pairs of ripples
+                for each export, and their totals
+    """
+
+    export_path = CURRENT_PATH_CWD / "EXPORT"
+    export_path.mkdir(parents=True, exist_ok=True)
+
+    file_locations = _get_batch_files(source=source)
+
+    patients = _get_patient_names(file_locations=file_locations)
+
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        timings = list(executor.map(_process_export, [str(item) for item in file_locations], patients,
+                                    [export_path] * len(patients), [min_percent] * len(patients),
+                                    [top_k] * len(patients)))
+
+    report = pd.DataFrame(timings, columns=["patient", "file", "ripples", "acquisition", "division", "basic database",
+                                            "analysis", "analysis database", "total", "compared pairs",
+                                            "skipped pairs", "error"])
+    totals = report.sum(numeric_only=True)
+    totals["patient"] = "TOTAL"
+    totals["wall time"] = round(time.perf_counter() - start, 3)
+    report = pd.concat([report, totals.to_frame().T], ignore_index=True)
+
+    data_display.write_dataframe_to_xls_file(df=report, file_path=export_path/"batch_timing_report.xlsx",
+                                             sheet_name="timing")
+
+    return report
+
+
+def _pair_report_message(pair_report: t.Dict[str, int]) -> str:
+    """
+    Returns the message with the number of pairs of ripples compared and skipped by the last comparison, see
+    Analyze.pair_report
+    """
+    return f"COMPARED PAIRS: {pair_report['compared pairs']} - SKIPPED PAIRS: {pair_report['skipped pairs']}"
+
+
+def _get_patient_names(file_locations: t.List[Path]) -> t.List[str]:
+    """
+    Returns the names of the output folders of the csv exports- the name of the csv, numbered when it is already
+    the name of another folder, so two exports are never written in the same folder
+    """
+    patients = []
+
+    for file_location in file_locations:
+        patient = file_location.stem
+        number = 1
+        while patient in patients:
+            patient = f"{file_location.stem}_{number}"
+            number += 1
+        patients.append(patient)
+
+    return patients
+
+
+def _get_batch_files(source: str) -> t.List[Path]:
+    """
+    Returns the paths of the csv exports in a directory or listed in a manifest file
+    """
+    source_path = CURRENT_PATH_CWD / source
+
+    if source_path.is_dir():
+        return sorted(source_path.glob("*.csv"))
+
+    file_locations = []
+    for line in source_path.read_text().splitlines():
+        line = line.strip()
+        #empty lines and comments are skipped
+        if line and not line.startswith("#"):
+            file_locations.append(source_path.parent / line)
+
+    return file_locations
+
+
+def _process_export(file_location: str, patient: str, export_path: Path, min_percent: float = 0.0,
+                    top_k: t.Optional[int] = None) -> t.Dict[str, t.Any]:
+    """
+    Runs the whole processing of one csv export, in a worker process of main_batch()
+
+    Args:
+        file_location: the path of the csv export
+        patient: the name of the folder of the export
+        export_path: the path of the folder where the folders of all the exports are created
+        min_percent: the min percentage of a connection between two ripples, see Analyze.compare_graphs()
+        top_k: the max number of connections kept per ripple, see Analyze.compare_graphs()
+
+    Returns:
+        timings: dict with the time in seconds of every step, the number of ripples, the number of compared and
+                skipped pairs of ripples and the error, if any
+    """
+
+    timings = {"patient": patient, "file": file_location}
+    start = time.perf_counter()
+    step_start = start
+
+    def end_step(name: str) -> None:
+        nonlocal step_start
+        now = time.perf_counter()
+        timings[name] = round(now - step_start, 3)
+        step_start = now
+
+    try:
+        glucose, insulin = data_acquisition.get_cached_glucose_and_insulin_data(file_name=file_location)
+        end_step("acquisition")
+
+        d = Divide(glucose=glucose, insulin=insulin)
+        start_end = d.interval()
+        data_path = export_path / patient / start_end
+        data_path.mkdir(parents=True, exist_ok=True)
+
+        trend_list = d.trend_setting()
+        threshold = 1
+        trend_list_count, cut_states = d.parting_by_runs(trend_list, threshold)
+        ripple_list = d.generate_ripple_store(trend_list, trend_list_count).ripples()
+        timings["ripples"] = len(ripple_list)
+        end_step("division")
+
+        _create_dataset_xls(divide=d, ripple_list=ripple_list, path=data_path, start_end=start_end)
+        _create_basic_database(divide=d, ripple_list=ripple_list, path=data_path, start_end=start_end)
+        end_step("basic database")
+
+        a = Analyze(ripple_list=ripple_list)
+        connection_matrix = a.compare_graphs_sparse(min_percent=min_percent, top_k=top_k)
+        connection_matrix.save(data_path/(constants.CONNECTIONS_FILE_NAME+start_end+".bin"))
+        ripple_connections = connection_matrix.to_lists()
+        timings["compared pairs"] = a.pair_report["compared pairs"]
+        timings["skipped pairs"] = a.pair_report["skipped pairs"]
+        end_step("analysis")
+
+        _create_analysis_database(ripple_connections=ripple_connections, path=data_path, start_end=start_end)
+        _extract_summary_of_analysis(ripple_connections=ripple_connections, start_end=start_end, path=data_path)
+        end_step("analysis database")
+
+    except Exception as error:
+        #one corrupted export should not stop the whole batch- the error is shown in the report
+        timings["error"] = repr(error)
+
+    timings["total"] = round(time.perf_counter() - start, 3)
+
+    return timings
+
+
 def _create_dataset_xls(divide: Divide, ripple_list: t.List[Ripple], path: Path,start_end:str) -> None:
     """
     Function to export the dataset to be used further in training
@@ -138,71 +371,104 @@ def _create_basic_database(divide: Divide, ripple_list: t.List[Ripple], path: Pa
     if db_new_name not in path.glob("*"):
 
         db = DatabaseManager(db_new_name)
+        _add_ripples_to_database(db=db, divide=divide, ripple_list=ripple_list)
+
+        return db
+
+    else:
+        db = DatabaseManager(db_new_name)
+        return db
 
-        #split the ripple into iterable and not iterable dictionaries 
-        data_dict, data_noniter = divide.divide_by_iterable(data=ripple_list[0])
-        #creates the table of non iterable items
-        db.create_table_if_not_exists("BASIC_DATA_SUMMARY", data_noniter)
 
-        #creates a new dict containing the same key but with values that are the 
-        # type of each list's composing items
+def _append_to_basic_database(divide: Divide, ripple_list: t.List[Ripple], path: Path, start_end: str,
+                              ripple_count: int = 0) -> DatabaseManager:
+    """
+    Appends ripples to the database of ripples, creating it if it does not exist yet. The ripples after the first
+    ripple_count ones are removed first- they were written by a run that was interrupted before its state was saved,
+    and are added again now- so running it again gives the same database
 
-        data_dict=data_reconfig.convert_to_list(data_dict)
+    Args:
+        divide: A Divide object containing methods for division
+        ripple_list: the list of the new ripple objects
+        path: the path where the database is saved
+        start_end: str representing the time interval timestamp value for the file
+        ripple_count: the number of ripples in the saved state, the ones the database keeps
 
-        simplified_data_iter = data_reconfig.get_name_and_type(data_dict=data_dict)
-        simplified_data_iter.setdefault("ID_ripple", 0)
+    Returns:
+        db:DatabaseManager object containing the glucose data
 
-        #creates the table for iterable items
-        name_of_individual = "_BASIC_RAW_DATA"
-        db.create_table_if_not_exists(name_of_individual, simplified_data_iter)
+    """
 
-        #takes each item in ripple list, divides it into iterable and not iterable
-        for item in ripple_list:
-            data_iter, data_noniter = divide.divide_by_iterable(data=item)
-            #extracts position of ripple in list (index from list)
-            _id = db.add("BASIC_DATA_SUMMARY", data_noniter)
+    db_new_name=path/(constants.GLUCOSE_DB+start_end+".db")
+    path.mkdir(parents=True, exist_ok=True)
 
-            #writes line per line the iterable values found in the ripple element at given index
-            for index in range(len(list(data_iter.values())[0])):
-                data_iter=data_reconfig.convert_to_list(data_iter)
-                simplified_data_iter_row = data_reconfig.get_name_and_value(data_iter=data_iter, index=index)
-                simplified_data_iter_row.setdefault("ID_ripple", _id)
-                db.add(name_of_individual, simplified_data_iter_row)
+    db = DatabaseManager(db_new_name)
 
-        return db
+    #the ids of the ripples start at 0, and the IDs of the rows at 1
+    if db.table_exists("BASIC_DATA_SUMMARY"):
+        db.delete_from("BASIC_DATA_SUMMARY", "ID", ripple_count + 1)
+    if db.table_exists("_BASIC_RAW_DATA"):
+        db.delete_from("_BASIC_RAW_DATA", "ID_ripple", ripple_count)
 
-    else:
-        db = DatabaseManager(db_new_name)
-        return db
+    _add_ripples_to_database(db=db, divide=divide, ripple_list=ripple_list)
 
-def _create_analysis_database(ripple_connections: t.List[t.List[t.Tuple[float, int, int]]], path: Path, start_end:str) \
-        -> DatabaseManager:
+    return db
+
+
+def _add_ripples_to_database(db: DatabaseManager, divide: Divide, ripple_list: t.List[Ripple]) -> None:
     """
-    Creates a database of ripple analysis
+    Adds the ripples to the tables of the database of ripples, creating the tables if they do not exist
+
+    Args:
+        db: the DatabaseManager object of the database of ripples
+        divide: A Divide object containing methods for division
+        ripple_list: a list of ripple objects
 
     """
 
-    key_list = ["percentage", "From_value", "To_value"]
-    ripple_connections_values = []
+    #split the ripple into iterable and not iterable dictionaries 
+    data_dict, data_noniter = divide.divide_by_iterable(data=ripple_list[0])
+    #creates the table of non iterable items
+    db.create_table_if_not_exists("BASIC_DATA_SUMMARY", data_noniter)
+
+    #creates a new dict containing the same key but with values that are the 
+    # type of each list's composing items
+
+    data_dict=data_reconfig.convert_to_list(data_dict)
+
+    simplified_data_iter = data_reconfig.get_name_and_type(data_dict=data_dict)
+    simplified_data_iter.setdefault("ID_ripple", 0)
+
+    #creates the table for iterable items
+    name_of_individual = "_BASIC_RAW_DATA"
+    db.create_table_if_not_exists(name_of_individual, simplified_data_iter)
+
+    #takes each item in ripple list, divides it into iterable and not iterable
+    for item in ripple_list:
+        data_iter, data_noniter = divide.divide_by_iterable(data=item)
+        #extracts position of ripple in list (index from list)
+        _id = db.add("BASIC_DATA_SUMMARY", data_noniter)
+
+        #writes line per line the iterable values found in the ripple element at given index
+        for index in range(len(list(data_iter.values())[0])):
+            data_iter=data_reconfig.convert_to_list(data_iter)
+            simplified_data_iter_row = data_reconfig.get_name_and_value(data_iter=data_iter, index=index)
+            simplified_data_iter_row.setdefault("ID_ripple", _id)
+            db.add(name_of_individual, simplified_data_iter_row)
 
-    for element in ripple_connections:
-        for item in element:
-            ripple_connections_values.append(item)
+def _create_analysis_database(ripple_connections: t.List[t.List[t.Tuple[float, int, int]]], path: Path, start_end:str) \
+        -> DatabaseManager:
+    """
+    Creates a database of ripple analysis
 
-    temp = data_reconfig.convert_from_tuple_list_to_dict(input_list=ripple_connections_values, key_list=key_list)
-    simplified_data = data_reconfig.get_name_and_type(temp)
+    """
 
     db_new_name=path/(constants.GLUCOSE_ANALYSIS_DB+start_end+".db")
 
     if db_new_name not in path.glob("*"):
 
         db = DatabaseManager(db_new_name)
-        name_of_individual = "_PATTERN_ANALYSIS_RAW_DATA"
-        db.create_table_if_not_exists(name_of_individual, simplified_data)
-
-        for index in range(len(list(temp.values())[0])):
-            simplified_data_iter_row = data_reconfig.get_name_and_value(data_iter=temp, index=index)
-            db.add(name_of_individual, simplified_data_iter_row)
+        _add_connections_to_database(db=db, ripple_connections=ripple_connections)
 
         return db
 
@@ -210,11 +476,125 @@ def _create_analysis_database(ripple_connections: t.List[t.List[t.Tuple[float, i
         db = DatabaseManager(db_new_name)
         return db
 
+
+def _append_to_analysis_database(ripple_connections: t.List[t.List[t.Tuple[float, int, int]]], path: Path,
+                                 start_end:str) -> DatabaseManager:
+    """
+    Appends new connections to the database of ripple analysis, creating it if it does not exist yet
+
+    """
+
+    db_new_name=path/(constants.GLUCOSE_ANALYSIS_DB+start_end+".db")
+
+    db = DatabaseManager(db_new_name)
+    _add_connections_to_database(db=db, ripple_connections=ripple_connections)
+
+    return db
+
+
+def _update_analysis_database(analyze: Analyze, ripple_count: int, path: Path, start_end: str,
+                              min_percent: float = 0.0, top_k: t.Optional[int] = None,
+                              workers: t.Optional[int] = None) -> t.List[t.List[t.Tuple[float, int, int]]]:
+    """
+    Compares the new ripples of an incremental run and appends their connections to the database of ripple analysis.
+    The connections with a ripple after the first ripple_count ones are removed first- they were written by a run
+    that was interrupted before its state was saved, and are compared again now- so running it again gives the
+    same database
+
+    Args:
+        analyze: the Analyze object of all the ripples, the ones of the saved state first
+        ripple_count: the number of ripples in the saved state
+        path: the folder of the database
+        start_end: the name of the export, as for _create_analysis_database()
+        min_percent/top_k/workers: see Analyze.update_connections()
+
+    Returns:
+        ripple_connections: the connections of all the ripples, as returned by Analyze.compare_graphs()
+    """
+
+    db_name = path/(constants.GLUCOSE_ANALYSIS_DB+start_end+".db")
+    if db_name.exists():
+        db = DatabaseManager(db_name)
+        if db.table_exists("_PATTERN_ANALYSIS_RAW_DATA"):
+            db.delete_from("_PATTERN_ANALYSIS_RAW_DATA", "From_value", ripple_count)
+            db.delete_from("_PATTERN_ANALYSIS_RAW_DATA", "To_value", ripple_count)
+
+    ripple_connections = _load_analysis_connections(path=path, start_end=start_end, ripple_count=ripple_count,
+                                                    top_k=top_k)
+
+    #only the pairs with a new ripple are compared, and ripple_connections is updated with them
+    new_ripple_connections = analyze.update_connections(connections=ripple_connections, min_percent=min_percent,
+                                                        top_k=top_k, workers=workers)
+
+    _append_to_analysis_database(ripple_connections=new_ripple_connections, path=path, start_end=start_end)
+
+    return ripple_connections
+
+
+def _add_connections_to_database(db: DatabaseManager,
+                                 ripple_connections: t.List[t.List[t.Tuple[float, int, int]]]) -> None:
+    """
+    Adds the connections to the table of the database of ripple analysis, creating the table if it does not exist
+
+    """
+
+    key_list = ["percentage", "From_value", "To_value"]
+    first_connection = next((element[0] for element in ripple_connections if element), None)
+
+    if first_connection is None:
+        return
+
+    simplified_data = dict(zip(key_list, first_connection))
+
+    name_of_individual = "_PATTERN_ANALYSIS_RAW_DATA"
+    db.create_table_if_not_exists(name_of_individual, simplified_data)
+
+    #all the rows are added in one transaction
+    db.add_rows(name_of_individual, key_list, (item for element in ripple_connections for item in element))
+
+
+def _load_analysis_connections(path: Path, start_end: str, ripple_count: int, top_k: t.Optional[int] = None) \
+        -> t.List[t.List[t.Tuple[float, int, int]]]:
+    """
+    Reads the connections stored in the database of ripple analysis, if there is one
+
+    Args:
+        path: the folder of the database
+        start_end: the name of the export, as for _create_analysis_database()
+        ripple_count: the number of ripples the connections are between
+        top_k: the max number of connections kept per ripple, see Analyze.compare_graphs(). The database has the
+            best connections of every run, so only the best of all of them are kept
+
+    Returns:
+        connections: the list of lists of tuples(float, int, int), as returned by Analyze.compare_graphs()
+    """
+
+    connections = [[] for _ in range(ripple_count)]
+
+    db_name = path/(constants.GLUCOSE_ANALYSIS_DB+start_end+".db")
+    if not db_name.exists():
+        return connections
+
+    db = DatabaseManager(db_name)
+    if db.table_exists("_PATTERN_ANALYSIS_RAW_DATA"):
+        for _id, percentage, position_from, position_to in db.select("_PATTERN_ANALYSIS_RAW_DATA"):
+            connections[position_from].append((percentage, position_from, position_to))
+
+    for item in connections:
+        item.sort()
+        if top_k is not None and len(item) > top_k:
+            del item[:len(item) - top_k]
+
+    return connections
+
 def _extract_summary_of_analysis(ripple_connections: t.List[t.List[t.Tuple[float, int, int]]],start_end:str,path:Path):
     summary_list = []
     sheet_name = "graph analysis"
 
     for item in ripple_connections:
+        #a ripple may have no connection at all, for example when none of them reaches the min percentage
+        if not item:
+            continue
         percent, position_from, position_to = item[-1]
         summary_list.append(f"from {position_from} to {position_to} there is a {round((percent) * 100)}% match")
 
@@ -230,14 +610,14 @@ def _create_stat_database(ripple_stat_list, path, start_end:str):
 
         db = DatabaseManager(db_new_name)
 
-        data = deepcopy(dict(vars(ripple_stat_list[0])))
+        data = deepcopy(ripple_stat_list[0].as_dict())
         data["slow_insulin_seq"]=data_reconfig.convert_list_of_tuples_to_string(data["slow_insulin_seq"])
         data["fast_insulin_seq"]=data_reconfig.convert_list_of_tuples_to_string(data["fast_insulin_seq"])
         db.create_table_if_not_exists("_GLUCOSE_STATS", data)
 
 
         for no,item in enumerate(ripple_stat_list):
-            data_noniter = deepcopy(dict(vars(item)))
+            data_noniter = deepcopy(item.as_dict())
             data_noniter["slow_insulin_seq"]=data_reconfig.convert_list_of_tuples_to_string(data_noniter["slow_insulin_seq"])
             data_noniter["fast_insulin_seq"]=data_reconfig.convert_list_of_tuples_to_string(data_noniter["fast_insulin_seq"])
             _id = db.add("_GLUCOSE_STATS", data_noniter)
@@ -250,4 +630,26 @@ def _create_stat_database(ripple_stat_list, path, start_end:str):
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--incremental", action="store_true",
+                        help="append a newer export of the same patient to the results of the previous one")
+    parser.add_argument("--batch", metavar="SOURCE",
+                        help="process every csv export in a directory or listed in a manifest file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes- the exports processed at once for --batch (default: one per "
+                             "processor), otherwise the processes that compare the ripples (default: 1)")
+    parser.add_argument("--min-percent", type=float, default=0.0,
+                        help="min similarity of two ripples to be connected, from 0 to 1; the pairs that can not "
+                             "reach it are skipped (default: 0, every match is kept)")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="keep only the best K matches of every ripple (default: all of them)")
+    args = parser.parse_args()
+
+    if args.batch:
+        report = main_batch(source=args.batch, workers=args.workers, min_percent=args.min_percent, top_k=args.top_k)
+        #the batch runs without the graphical interface, so the report is shown in the console
+        print(report.to_string(index=False))
+    elif args.incremental:
+        main_incremental(min_percent=args.min_percent, top_k=args.top_k, workers=args.workers)
+    else:
+        main(min_percent=args.min_percent, top_k=args.top_k, workers=args.workers)
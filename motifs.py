@@ -0,0 +1,247 @@
+"""
+Module for finding motifs- the pairs of windows of the glucose series that look the most alike- and discords- the
+windows that look like nothing else- directly over the glucose values, so the patterns that cross the borders of the
+ripples are found too. They come from the matrix profile of the series: the z-normalized distance of every window to
+its nearest match that does not overlap it
+"""
+
+import math
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from ripple_store import RippleStore
+
+# the windows of the motifs, in number of values- with a value every 5 minutes, 1, 2 and 3 hours
+WINDOWS = (12, 24, 36)
+
+# the number of motifs and discords returned per window
+MOTIF_COUNT = 3
+
+# the windows closer than window / EXCLUSION_RATIO to each other overlap too much to be a match
+EXCLUSION_RATIO = 4
+
+
+def exclusion_zone(window: int) -> int:
+    """
+    Returns the number of positions around a window where the other windows overlap it too much to be its match-
+    the windows i and j are trivial matches when abs(i - j) < exclusion_zone(window)
+    """
+    return math.ceil(window / EXCLUSION_RATIO)
+
+
+def sliding_dot_product(query: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Function that returns the dot product of the query with every window of the values of the same length, with
+    one FFT convolution
+
+    Args:
+        query: float array of m values
+        values: float array of n values, n >= m
+
+    Returns:
+        float array of n - m + 1 dot products
+    """
+    m, n = len(query), len(values)
+    size = 1 << (n + m - 1).bit_length()
+    product = np.fft.irfft(np.fft.rfft(values, size) * np.fft.rfft(query[::-1], size), size)
+
+    return product[m - 1:n]
+
+
+def matrix_profile(values: np.ndarray, window: int, flat_matches: bool = False) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Function that computes the matrix profile of a series. Like STOMP, the dot products of the first window with
+    all the others come from sliding_dot_product(), and every next one is updated from the one before it in
+    constant time- here along the diagonals of the distance matrix, one diagonal at a time with a cumulative sum,
+    so the time is O(n**2) and the memory O(n).
+
+    The windows with all the values equal have no shape. In the glucose series they are plateaus of the sensor-
+    readings clipped at LOW/HIGH or a stuck sensor- so by default they have no match, and they would be the best
+    motifs otherwise.
+
+    Args:
+        values: float array of the series
+        window: the number of values of a window
+        flat_matches: if True, the flat windows match each other at distance 0, and the other windows at the
+                    distance of uncorrelated windows
+
+    Returns:
+        (profile, profile_index): float array with the z-normalized distance of every window to its nearest match
+                                out of its exclusion zone, and int array with the start of that match- inf and -1
+                                when there is none
+    """
+    values = np.asarray(values, dtype=np.float64)
+    window_count = len(values) - window + 1
+    if window < 2 or window_count < 1:
+        return np.full(max(window_count, 0), np.inf), np.full(max(window_count, 0), -1, dtype=np.int64)
+
+    # the mean of the series is taken out, which keeps the products small and does not change the distances
+    values = values - values.mean()
+    windows = np.lib.stride_tricks.sliding_window_view(values, window)
+    # the windows with all the values equal have no shape, they are handled at the end
+    flat = windows.max(axis=1) == windows.min(axis=1)
+    deviation = np.where(flat, 1.0, windows.std(axis=1))
+
+    # the correlation of the windows i and j is products * scale[i] * scale[j] - shift[i] * shift[j], and 0 when
+    # one of them is flat
+    scale = np.where(flat, 0.0, 1 / (math.sqrt(window) * deviation))
+    shift = np.where(flat, 0.0, windows.mean(axis=1) / deviation)
+
+    first_products = sliding_dot_product(values[:window], values)
+
+    exclusion = exclusion_zone(window)
+    positions = np.arange(window_count)
+    best_correlation = np.full(window_count, -np.inf)
+    profile_index = np.full(window_count, -1, dtype=np.int64)
+    products = np.empty(window_count)
+    correlation = np.empty(window_count)
+    better = np.empty(window_count, dtype=bool)
+
+    for diagonal in range(exclusion, window_count):
+        count = window_count - diagonal
+        first, second = slice(0, count), slice(diagonal, window_count)
+
+        # the dot product of the windows i and i + diagonal, from the one of i - 1 and i - 1 + diagonal
+        change = products[1:count]
+        np.multiply(values[window:window + count - 1], values[diagonal + window:diagonal + window + count - 1],
+                    out=change)
+        change -= values[:count - 1] * values[diagonal:diagonal + count - 1]
+        np.cumsum(change, out=change)
+        products[0] = 0.0
+        products[:count] += first_products[diagonal]
+
+        current = correlation[:count]
+        np.multiply(products[:count], scale[first], out=current)
+        current *= scale[second]
+        current -= shift[first] * shift[second]
+
+        # every pair is the best match of its first window or of its second one, or of none
+        is_better = better[:count]
+        np.greater(current, best_correlation[first], out=is_better)
+        np.copyto(best_correlation[first], current, where=is_better)
+        np.copyto(profile_index[first], positions[second], where=is_better)
+
+        np.greater(current, best_correlation[second], out=is_better)
+        np.copyto(best_correlation[second], current, where=is_better)
+        np.copyto(profile_index[second], positions[first], where=is_better)
+
+    # a flat window matches another flat one out of its exclusion zone, if there is any- the first or the last one
+    flat_positions = np.flatnonzero(flat)
+    if flat_matches and len(flat_positions):
+        for other in (flat_positions[0], flat_positions[-1]):
+            matched = flat & (np.abs(positions - other) >= exclusion) & (best_correlation < 1.0)
+            best_correlation[matched] = 1.0
+            profile_index[matched] = other
+
+    profile = np.sqrt(np.maximum(2 * window * (1 - np.minimum(best_correlation, 1.0)), 0))
+    if not flat_matches:
+        profile_index[flat] = -1
+    profile[profile_index < 0] = np.inf
+
+    return profile, profile_index
+
+
+def top_motifs(profile: np.ndarray, profile_index: np.ndarray, window: int, count: int = MOTIF_COUNT) \
+        -> t.List[t.Tuple[int, int, float]]:
+    """
+    Function that returns the best motifs of a matrix profile- the closest pairs of windows, where no window is in
+    the exclusion zone of a window of a better motif
+
+    Returns:
+        list of tuples(start of the first window, start of its match, distance), best first
+    """
+    exclusion = exclusion_zone(window)
+    excluded = np.zeros(len(profile), dtype=bool)
+    motifs = []
+
+    for start in np.argsort(profile, kind="stable").tolist():
+        if len(motifs) == count or not np.isfinite(profile[start]):
+            break
+        match = int(profile_index[start])
+        if excluded[start] or excluded[match]:
+            continue
+
+        motifs.append((start, match, float(profile[start])))
+        for position in (start, match):
+            excluded[max(0, position - exclusion + 1):position + exclusion] = True
+
+    return motifs
+
+
+def top_discords(profile: np.ndarray, window: int, count: int = MOTIF_COUNT) -> t.List[t.Tuple[int, float]]:
+    """
+    Function that returns the discords of a matrix profile- the windows farthest from their nearest match, that do
+    not overlap each other
+
+    Returns:
+        list of tuples(start of the window, distance), the most unusual first
+    """
+    excluded = np.zeros(len(profile), dtype=bool)
+    discords = []
+
+    for start in np.argsort(-profile, kind="stable").tolist():
+        if len(discords) == count:
+            break
+        if excluded[start] or not np.isfinite(profile[start]):
+            continue
+
+        discords.append((start, float(profile[start])))
+        excluded[max(0, start - window + 1):start + window] = True
+
+    return discords
+
+
+def ripples_of_window(offset: np.ndarray, length: np.ndarray, start: int, window: int) -> t.List[int]:
+    """
+    Function that returns the ripples a window of the series overlaps
+
+    Args:
+        offset/length: int arrays with the position of the first value and the number of values of each ripple,
+                    as in RippleStore
+        start: the position of the first value of the window
+        window: the number of values of the window
+
+    Returns:
+        the list of the indexes of the ripples
+    """
+    first = int(np.searchsorted(offset + length, start, side="right"))
+    last = int(np.searchsorted(offset, start + window, side="left"))
+
+    return list(range(first, min(last, len(offset))))
+
+
+def find_motifs(store: RippleStore, glucose: t.Optional[pd.DataFrame] = None, windows: t.Iterable[int] = WINDOWS,
+                count: int = MOTIF_COUNT) -> t.List[t.Dict[str, t.Any]]:
+    """
+    Function that finds the motifs and discords of the glucose values of a division for every window length and
+    maps them to the ripples they overlap. The values are taken as consecutive, as the ripples take them. The
+    windows of the plateaus of the sensor are neither motifs nor discords, see matrix_profile().
+
+    Args:
+        store: the RippleStore of the division
+        glucose: the glucose dataframe the store was divided from- all its values are searched, the tail after the
+                last ripple too, whose windows overlap no ripple. None only searches the values of the ripples
+        windows: the window lengths, in number of values
+        count: the number of motifs and discords per window
+
+    Returns:
+        list of dicts, one per window, with the window, the motifs- (start, match start, distance, ripples of the
+        first window, ripples of the match)- and the discords- (start, distance, ripples of the window)
+    """
+    bg = store.bg if glucose is None else glucose.iloc[:, 1].to_numpy(dtype=np.float64)
+    results = []
+
+    for window in windows:
+        profile, profile_index = matrix_profile(bg, window)
+
+        motifs = [(start, match, distance, ripples_of_window(store.offset, store.length, start, window),
+                   ripples_of_window(store.offset, store.length, match, window))
+                  for start, match, distance in top_motifs(profile, profile_index, window, count=count)]
+        discords = [(start, distance, ripples_of_window(store.offset, store.length, start, window))
+                    for start, distance in top_discords(profile, window, count=count)]
+
+        results.append({"window": window, "motifs": motifs, "discords": discords})
+
+    return results
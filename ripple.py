@@ -2,7 +2,7 @@
 The module for object Ripple. Has all the methods and values of it
 """
 
-import copy
+from datetime import datetime
 from pathlib import Path
 import pandas as pd
 import plotly.express as px
@@ -10,81 +10,224 @@ import plotly.graph_objects as go
 import typing as t
 
 import numpy as np
-from scipy.optimize import curve_fit
+
+from ripple_fit import fit_equations
 
 CURRENT_PATH_CWD = Path.cwd()
 IMAGES_PATH = CURRENT_PATH_CWD / "images_and_graphs"
 
+# the attributes of a ripple, in the order they are exported
+RIPPLE_ATTRIBUTES = ("bg", "time_v", "trend_v", "normalized_graph", "mean", "start_t", "end_t", "duration_v",
+                     "min_v", "min_t", "min_index", "max_v", "max_t", "max_index", "a", "b", "c", "d", "e", "f",
+                     "check_curve", "domain_start", "domain_end")
+# the attributes above that hold one value per glucose reading
+RIPPLE_SEQUENCE_ATTRIBUTES = ("bg", "time_v", "trend_v", "normalized_graph", "check_curve")
+
+
+def fit_equation(x: t.List[int], y: np.ndarray, max_v: float) -> t.Tuple[t.Tuple[float, ...], t.List[float]]:
+    """
+    Function that fits the equation of a graph- see Ripple._get_equation() and ripple_fit.fit_equations()
+
+    Args:
+        x: the repositioned axis of the graph
+        y: the glucose values of the graph
+        max_v: the max glucose value of the graph
+
+    Returns:
+        (coefficients, check_curve): the tuple of equation parameters (a, b, c, d, e, f) and the list of values
+                                    of the calculated curve on x
+    """
+    coefficients, check_curve = fit_equations(bg=np.asarray(y, dtype=np.float64), offset=np.array([0]),
+                                              length=np.array([len(x)]), max_index=np.array([-x[0]]),
+                                              max_v=np.array([max_v], dtype=np.float64))
+
+    return tuple(coefficients[0]), check_curve.tolist()
+
+
+def round_values(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Function that rounds every value of an array the same way as the builtin round(). numpy rounds the scaled values,
+    which can go the other way for the ones that land next to a half- those few are rounded one by one
+
+    Args:
+        values: float array
+        digits: the number of decimals kept
+
+    Returns:
+        float array of the rounded values
+    """
+    scale = 10.0 ** digits
+    scaled = values * scale
+    nearest = np.round(scaled)
+    rounded = nearest / scale
+
+    near_half = np.abs(scaled - nearest) > 0.5 - 1e-6
+    rounded[near_half] = [round(value, digits) for value in values[near_half].tolist()]
+
+    return rounded
+
+
+class _Derived:
+    """
+    Attribute of a Ripple that is derived from its data. It is computed by the given method of the ripple the first
+    time it is read and kept until the data changes (see Ripple.invalidate())
+    """
+
+    def __init__(self, method_name: str):
+        self.method_name = method_name
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, instance: t.Optional["Ripple"], owner: type = None) -> t.Any:
+        if instance is None:
+            return self
+
+        if self.name not in instance._derived:
+            getattr(instance, self.method_name)()
+
+        return instance._derived[self.name]
+
+    def __set__(self, instance: "Ripple", value: t.Any) -> None:
+        instance._derived[self.name] = value
+
+
+def _compact_values(values: t.Iterable[float]) -> np.ndarray:
+    """
+    Function that stores glucose values, or their trends, in the smallest typed array that keeps them exact- int16 for
+    whole numbers, as the mg/dL readings are, and float32 otherwise
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if np.all(values == np.round(values)) and np.all(np.abs(values) <= np.iinfo(np.int16).max):
+        return values.astype(np.int16)
+
+    return values.astype(np.float32)
+
 
 class Ripple:
     """
     Object Ripple is a class that stores the blood glucose values from the csv, together with additional info. The
     way it is defined, a Ripple object will contain only ONE  change of sign of the graph-simply put one change from
     an ascending part to descending part or vice versa. For more information see definition of add_values method.(
-    bg=dataframe slice type-int values| time_v= dataframe slice type-datetime values| trend_v=float list type|
-    normalized_graph=float list type| mean= single float value| start_t=datetime| end_t=datetime| duration_v= timedelta type| min_v=int type| min_t=
-    timedate type| min_index= int type| max_v=int type| max_t= timedate type| max_index= int type)
+    bg=pandas Series of float values| time_v= pandas Series of datetime values| trend_v=float list type|
+    normalized_graph=float array type| mean= single float value| start_t=datetime| end_t=datetime| duration_v= timedelta type| min_v=float type| min_t=
+    timedate type| min_index= int type| max_v=float type| max_t= timedate type| max_index= int type)
 
+    The values are kept as typed arrays (glucose and trends as int16- or float32 if not whole numbers- and the times
+    as int64 nanoseconds since epoch); bg, time_v and trend_v are built from them when read.
+    The attributes that are exported are listed in RIPPLE_ATTRIBUTES.
     """
 
+    __slots__ = ("_glucose", "_epoch_ns", "_trend", "_derived")
+
+    # the derived attributes, computed from bg/time_v/trend_v the first time they are read
+    normalized_graph = _Derived("_normalize_graph")
+    mean = _Derived("_make_average_glucose")
+    start_t = _Derived("_make_duration")
+    end_t = _Derived("_make_duration")
+    duration_v = _Derived("_make_duration")
+    min_v = _Derived("_get_min_max_value_time")
+    min_t = _Derived("_get_min_max_value_time")
+    min_index = _Derived("_get_min_max_value_time")
+    max_v = _Derived("_get_min_max_value_time")
+    max_t = _Derived("_get_min_max_value_time")
+    max_index = _Derived("_get_min_max_value_time")
+
+    a = _Derived("_get_equation")
+    b = _Derived("_get_equation")
+    c = _Derived("_get_equation")
+    d = _Derived("_get_equation")
+    e = _Derived("_get_equation")
+    f = _Derived("_get_equation")
+
+    check_curve = _Derived("_get_equation") # data of calculated curve
+
+    domain_start = _Derived("_reposition_axis")
+    domain_end = _Derived("_reposition_axis")
+
     def __init__(self):
-        self.bg = pd.DataFrame()
-        self.time_v = pd.DataFrame()
-        self.trend_v = []
-        self.normalized_graph = []
-        self.mean = 0.0
-        self.start_t=0
-        self.end_t=0
-        self.duration_v = 0.0
-        self.min_v = 0.0
-        self.min_t = 0.0
-        self.min_index = 0
-        self.max_v = 0.0
-        self.max_t = 0.0
-        self.max_index = 0
-
-        self.a=0.0
-        self.b=0.0
-        self.c=0.0
-        self.d=0.0
-        self.e=0.0
-        self.f=0.0
-
-        self.check_curve=[] # data of calculated curve
-
-        self.domain_start=0.0
-        self.domain_end=0.0
-
-    def add_values(self, bg_value: pd.DataFrame, time_value: pd.DataFrame, trend_value: list) -> None:
+        self._glucose = np.empty(0, dtype=np.int16)
+        self._epoch_ns = np.empty(0, dtype=np.int64)
+        self._trend = np.empty(0, dtype=np.int16)
+
+        # the values of an empty ripple
+        self._derived = {"normalized_graph": [], "mean": 0.0, "start_t": 0, "end_t": 0, "duration_v": 0.0,
+                         "min_v": 0.0, "min_t": 0.0, "min_index": 0, "max_v": 0.0, "max_t": 0.0, "max_index": 0,
+                         "a": 0.0, "b": 0.0, "c": 0.0, "d": 0.0, "e": 0.0, "f": 0.0, "check_curve": [],
+                         "domain_start": 0.0, "domain_end": 0.0}
+
+    @property
+    def bg(self) -> pd.Series:
+        return pd.Series(self._glucose, dtype=np.float64, name='Glucose Value (mg/dL)')
+
+    @bg.setter
+    def bg(self, value: t.Iterable[float]) -> None:
+        self._glucose = _compact_values(value)
+        self.invalidate()
+
+    @property
+    def time_v(self) -> pd.Series:
+        return pd.Series(self._epoch_ns.view('datetime64[ns]'), name='Timestamp')
+
+    @time_v.setter
+    def time_v(self, value: t.Iterable[datetime]) -> None:
+        self._epoch_ns = np.array(pd.to_datetime(value), dtype='datetime64[ns]').view(np.int64)
+        self.invalidate()
+
+    @property
+    def trend_v(self) -> t.List[float]:
+        return self._trend.astype(np.float64).tolist()
+
+    @trend_v.setter
+    def trend_v(self, value: t.Iterable[float]) -> None:
+        self._trend = _compact_values(value)
+        self.invalidate()
+
+    def invalidate(self) -> None:
         """
-        Method for initializing the class. Runs the methods (duration()| average_glucose()| min_max_value_time()|
-        normalizing()) bg_value: is a slice from a DataFrame- it extracts only the column with blood glucose values|
+        Method that drops the derived attributes, so they are computed again from the data when read. It is called
+        when bg/time_v/trend_v are set- call it after changing them in place.
+        """
+        self._derived = {}
+
+    def add_values(self, bg_value: t.Iterable[float], time_value: t.Iterable[datetime],
+                   trend_value: t.Iterable[float]) -> None:
+        """
+        Method for initializing the class. The derived attributes (duration()| average_glucose()|
+        min_max_value_time()| normalizing()| equation()) are computed when first read. bg_value: is a slice from a
+        DataFrame- it extracts only the column with blood glucose values|
         time_value: slice from DataFrame- it extracts the timedate for the previous extracted blood glucose|
         trend_value: standard list containing the differences in values between the current number (the one that
-        gives the index value) and the previous one
+        gives the index value) and the previous one. The values are copied into the typed arrays of the ripple.
 
         """
-        self.bg = copy.deepcopy(bg_value)
-        self.time_v = copy.deepcopy(time_value)
-        self.trend_v = copy.deepcopy(trend_value)
-
-        self._inner_init()
+        self.bg = bg_value
+        self.time_v = time_value
+        self.trend_v = trend_value
 
     def _inner_init(self) -> None:
+        """
+        Method that computes all the derived attributes at once, instead of when they are first read
+        """
         self._make_duration()
         self._make_average_glucose()
         self._get_min_max_value_time()
         self._normalize_graph()
         self._get_equation()
 
+    def _time_at(self, position: int) -> pd.Timestamp:
+        """Returns the timestamp at a position inside the ripple"""
+        return pd.Timestamp(int(self._epoch_ns[position]))
+
     def _make_duration(self) -> None:
         """
         Method for extracting the total time duration of a ripple object. As both start and end date are timedate
         objects the result is timedelta. self.duration=timedelta type
 
         """
-        self.start_t=self.time_v.iat[0]
-        self.end_t=self.time_v.iat[len(self.time_v) - 1]
+        self.start_t = self._time_at(0)
+        self.end_t = self._time_at(-1)
         self.duration_v = self.end_t - self.start_t
 
     def _make_average_glucose(self) -> None:
@@ -92,58 +235,41 @@ class Ripple:
         Method for obtaining the mean value of all the bloodglucose values in this period of time.
         self.mean=float type
         """
-        x = 0
-        count = 0
-
-        for elements in self.bg:
-            x += elements
-            count += 1
-
-        self.mean = round(x / count, 2)
+        self.mean = round(float(self._glucose.sum(dtype=np.float64)) / len(self._glucose), 2)
 
     def _get_min_max_value_time(self) -> None:
         """
-        Method for obtaining the min and max value, time and index in the DataFrame slice.
-        (self.min_v=int type| self.min_t= timedate type| self.min_index= int type|
-         self.max_v=int type| self.max_t= timedate type| self.max_index= int type)
+        Method for obtaining the min and max value, time and index in the ripple- the first position of each, if
+        they repeat. (self.min_v=float type| self.min_t= timedate type| self.min_index= int type|
+         self.max_v=float type| self.max_t= timedate type| self.max_index= int type)
 
         """
+        self.max_index = int(np.argmax(self._glucose))
+        self.min_index = int(np.argmin(self._glucose))
 
-        self.min_v = min(self.bg)
-        self.max_v = max(self.bg)
+        self.max_v = float(self._glucose[self.max_index])
+        self.min_v = float(self._glucose[self.min_index])
 
-        self.max_index = list(self.bg).index(self.max_v)
-        self.min_index = list(self.bg).index(self.min_v)
-
-        self.max_t = self.time_v.iat[self.max_index]
-        self.min_t = self.time_v.iat[self.min_index]
+        self.max_t = self._time_at(self.max_index)
+        self.min_t = self._time_at(self.min_index)
 
     def _normalize_graph(self) -> None:
         """
-        Method for normalizing the graph. Basically it defines a list as long as the DataFrame slice with float
-        values going from (0,1]. self.normalized_graph= float list type
+        Method for normalizing the graph. Basically it defines an array as long as the ripple with float
+        values going from (0,1]. self.normalized_graph= float array type
 
         """
-        temp_normalized_graph = []
-
-        for item in list(self.bg):
-            temp_normalized_graph.append(round(item / self.max_v, 2))
-
-        self.normalized_graph = copy.deepcopy(temp_normalized_graph)
+        self.normalized_graph = round_values(self._glucose / self.max_v, 2)
 
     def _reposition_axis(self) -> t.List[int] :
         """
         Method for sliding the axis value on x
         """
-        count = len(self.normalized_graph)
-        slided_x = []
+        slided_x = list(range(-self.max_index, len(self._glucose) - self.max_index))
 
-        for i in range(count):
-            slided_x.append(i-self.max_index)
-        
         self.domain_start=slided_x[0]
         self.domain_end=slided_x[-1]
-        
+
         return slided_x
 
     def _get_equation(self) ->None:
@@ -157,25 +283,17 @@ class Ripple:
         the function should return something in the domain of (0,1]- that is why in the test and in the self.check-curve everything 
         is multiplied by self.max value- to have comparable parameters 
         """
-        y=self.bg.to_numpy()
-        #y=self.normalized_graph
+        y=self._glucose.astype(np.float64)
         x=self._reposition_axis()
 
-        def test(x_t,a,b,c,d,e,f):
-            """
-            Method for calculating the equation- or where the basic structure of the graph is standardized
-            """
-            return self.max_v*(a*x_t**5+b*x_t**4+c*x_t**3+d*x_t**2+e*x_t+f)
-        
-        (self.a, self.b, self.c, self.d, self.e, self.f),covar=curve_fit(test,x,y)
-        self.check_curve=[self.max_v*(self.a*item**5+
-                          self.b*item**4+
-                          self.c*item**3+
-                          self.d*item**2+
-                          self.e*item+
-                          self.f)
-                            for item in x]
-        
+        (self.a, self.b, self.c, self.d, self.e, self.f), check_curve = fit_equation(x, y, self.max_v)
+        self.check_curve = np.asarray(check_curve, dtype=np.float64)
+
+    def as_dict(self) -> dict:
+        """
+        Method that returns the attributes of the ripple, in the order of RIPPLE_ATTRIBUTES
+        """
+        return {name: getattr(self, name) for name in RIPPLE_ATTRIBUTES}
         
     def _compile_legend(self) -> str:
         """
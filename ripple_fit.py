@@ -0,0 +1,87 @@
+"""
+Module for fitting the equation of the ripples. The degree 5 polynomial of Ripple._get_equation() is linear in its
+parameters, so instead of an iterative solver per ripple it is fitted as a linear least squares problem, solved at
+once for all the ripples of the same length
+"""
+
+import math
+import typing as t
+
+import numpy as np
+
+DEGREE = 5
+
+
+def fit_equations(bg: np.ndarray, offset: np.ndarray, length: np.ndarray, max_index: np.ndarray,
+                  max_v: np.ndarray) -> t.Tuple[np.ndarray, np.ndarray]:
+    """
+    Function that fits the equation max_v*(a*x**5+b*x**4+c*x**3+d*x**2+e*x+f) of every ripple, where x is the axis
+    repositioned so that 0 is at the max value (see Ripple._reposition_axis()).
+
+    The ripples of the same length share one design matrix. It is built on a centered and scaled axis, so it is
+    well conditioned, and its pseudo inverse solves all of them with one matrix product. The parameters are
+    then moved from the scaled axis to the repositioned one of each ripple.
+
+    Args:
+        bg: float array of the glucose values of all the ripples, one after the other
+        offset/length: int arrays with the position of the first value and the number of values of each ripple
+        max_index: int array with the position of the max value inside each ripple
+        max_v: float array with the max value of each ripple
+
+    Returns:
+        (coefficients, check_curve): float array of (a, b, c, d, e, f) per ripple and float array of the values of
+                                    the calculated curves, with the same layout as bg
+    """
+    coefficients = np.empty((len(length), DEGREE + 1), dtype=np.float64)
+    check_curve = np.empty(len(bg), dtype=np.float64)
+
+    powers = np.arange(DEGREE + 1)
+    # binomial[j, r]- the number of ways x**r comes out of (x + shift)**j
+    binomial = np.array([[math.comb(j, r) for r in range(DEGREE + 1)] for j in range(DEGREE + 1)], dtype=np.float64)
+
+    for ripple_length in np.unique(length).tolist():
+        group = np.flatnonzero(length == ripple_length)
+        positions = offset[group][:, None] + np.arange(ripple_length)[None, :]
+
+        # the equation is scaled by max_v, so the normalized values are fitted
+        y = bg[positions] / max_v[group][:, None]
+
+        center = (ripple_length - 1) / 2
+        scale = max(center, 1.0)
+        design = np.vander((np.arange(ripple_length) - center) / scale, DEGREE + 1, increasing=True)
+
+        # parameters of the powers of u = (i - center)/scale, where i is the position inside the ripple
+        scaled_parameters = y @ np.linalg.pinv(design).T
+
+        # i - center = x + shift, where x = i - max_index is the repositioned axis
+        shift = (max_index[group] - center)[:, None, None]
+        exponent = powers[:, None] - powers[None, :]
+        conversion = binomial * np.where(exponent >= 0, shift ** np.maximum(exponent, 0), 0.0)
+        parameters = np.einsum('kj,kjr->kr', scaled_parameters / scale ** powers, conversion)
+
+        # from increasing powers to (a, b, c, d, e, f)
+        coefficients[group] = parameters[:, ::-1]
+
+        x = np.arange(ripple_length)[None, :] - max_index[group][:, None]
+        check_curve[positions] = max_v[group][:, None] * evaluate_equations(coefficients[group], x)
+
+    return coefficients, check_curve
+
+
+def evaluate_equations(coefficients: np.ndarray, x: np.ndarray) -> np.ndarray:
+    """
+    Function that evaluates the polynomials a*x**5+b*x**4+c*x**3+d*x**2+e*x+f with Horner's scheme
+
+    Args:
+        coefficients: float array of (a, b, c, d, e, f) per polynomial
+        x: float array of points, one row per polynomial
+
+    Returns:
+        the values of the polynomials at the points, with the shape of x
+    """
+    result = np.zeros(x.shape, dtype=np.float64)
+
+    for power in range(DEGREE + 1):
+        result = result * x + coefficients[:, power][:, None]
+
+    return result
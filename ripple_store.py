@@ -0,0 +1,196 @@
+"""
+Module for the array backed storage of ripples. Instead of one object holding its own pandas slices per ripple,
+all the ripples share contiguous arrays and every ripple is a lightweight view into them
+"""
+
+import typing as t
+
+import numpy as np
+import pandas as pd
+
+from ripple import Ripple, round_values
+from ripple_fit import fit_equations
+
+
+class RippleStore:
+    """
+    Struct of arrays that stores all the ripples of a division. (bg= float array of all glucose values| time_v=
+    datetime array| trend_v= float array| normalized_graph= float array| check_curve= float array| all of them
+    contiguous, in the order of the ripples) and one array per ripple attribute, indexed by ripple (offset= int
+    position of the first value| length= int number of values| mean= float| min_v/max_v= float| min_index/
+    max_index= int position inside the ripple| start_t/end_t/min_t/max_t= datetime| coefficients= float array of
+    (a, b, c, d, e, f) per ripple)
+    """
+
+    def __init__(self, glucose: pd.DataFrame, trend_list: t.List[int], trend_list_count: t.List[int]):
+        """
+        Args:
+            glucose: the glucose dataframe that was divided
+            trend_list: the list with trends for each value
+            trend_list_count: the list with number of elements per ripple
+        """
+        self.length = np.asarray(trend_list_count, dtype=np.int64)
+        self.offset = np.cumsum(self.length) - self.length
+        covered = int(self.length.sum())
+
+        self.bg = glucose.iloc[:covered, 1].to_numpy(dtype=np.float64)
+        self.time_v = glucose.iloc[:covered, 0].to_numpy(dtype='datetime64[ns]')
+        self.trend_v = np.asarray(trend_list[:covered], dtype=np.float64)
+
+        self._compute_summaries()
+
+        # the equations of all the ripples are fitted together
+        self.coefficients, self.check_curve = fit_equations(bg=self.bg, offset=self.offset, length=self.length,
+                                                            max_index=self.max_index, max_v=self.max_v)
+
+    def __len__(self) -> int:
+        return len(self.length)
+
+    def _compute_summaries(self) -> None:
+        """
+        Method that computes the attributes of all the ripples at once, the same as Ripple does for each of them,
+        with reductions over the segments of the contiguous arrays
+        """
+        ripple_count = len(self.length)
+        self.mean = np.empty(ripple_count, dtype=np.float64)
+        self.min_v = np.empty(ripple_count, dtype=np.float64)
+        self.max_v = np.empty(ripple_count, dtype=np.float64)
+        self.min_index = np.empty(ripple_count, dtype=np.int64)
+        self.max_index = np.empty(ripple_count, dtype=np.int64)
+        self.normalized_graph = np.empty(len(self.bg), dtype=np.float64)
+
+        # reduceat needs at least one segment, and every ripple has at least one value
+        if ripple_count:
+            # the values are whole numbers, so the sum is the same as adding them one by one
+            self.mean = round_values(np.add.reduceat(self.bg, self.offset) / self.length, 2)
+            self.min_v = np.minimum.reduceat(self.bg, self.offset)
+            self.max_v = np.maximum.reduceat(self.bg, self.offset)
+
+            # the first position of the min/max, as list.index()- the smallest position holding the value
+            positions = np.arange(len(self.bg))
+            no_position = len(self.bg)
+            self.min_index = np.minimum.reduceat(np.where(self.bg == np.repeat(self.min_v, self.length),
+                                                          positions, no_position), self.offset) - self.offset
+            self.max_index = np.minimum.reduceat(np.where(self.bg == np.repeat(self.max_v, self.length),
+                                                          positions, no_position), self.offset) - self.offset
+
+            self.normalized_graph = round_values(self.bg / np.repeat(self.max_v, self.length), 2)
+
+        self.start_t = self.time_v[self.offset]
+        self.end_t = self.time_v[self.offset + self.length - 1]
+        self.min_t = self.time_v[self.offset + self.min_index]
+        self.max_t = self.time_v[self.offset + self.max_index]
+
+    def ripples(self) -> t.List["StoredRipple"]:
+        """Returns the list of views of all the ripples"""
+        return [StoredRipple(self, index) for index in range(len(self))]
+
+
+class StoredRipple(Ripple):
+    """
+    View of one ripple of a RippleStore. It has the same attributes as Ripple, read from the arrays of the store,
+    so it can be used anywhere a Ripple is used. Only the store and the index are held by the view.
+    """
+
+    __slots__ = ("_store", "_index")
+
+    def __init__(self, store: RippleStore, index: int):
+        self._store = store
+        self._index = index
+
+    def _slice(self, values: np.ndarray) -> np.ndarray:
+        """Returns the part of a contiguous array of the store that belongs to this ripple"""
+        start = self._store.offset[self._index]
+        return values[start:start + self._store.length[self._index]]
+
+    @property
+    def bg(self) -> pd.Series:
+        return pd.Series(self._slice(self._store.bg), name='Glucose Value (mg/dL)')
+
+    @property
+    def time_v(self) -> pd.Series:
+        return pd.Series(self._slice(self._store.time_v), name='Timestamp')
+
+    @property
+    def trend_v(self) -> t.List[float]:
+        return self._slice(self._store.trend_v).tolist()
+
+    @property
+    def normalized_graph(self) -> np.ndarray:
+        return self._slice(self._store.normalized_graph)
+
+    @property
+    def check_curve(self) -> np.ndarray:
+        return self._slice(self._store.check_curve)
+
+    @property
+    def mean(self) -> float:
+        return float(self._store.mean[self._index])
+
+    @property
+    def start_t(self) -> pd.Timestamp:
+        return pd.Timestamp(self._store.start_t[self._index])
+
+    @property
+    def end_t(self) -> pd.Timestamp:
+        return pd.Timestamp(self._store.end_t[self._index])
+
+    @property
+    def duration_v(self) -> pd.Timedelta:
+        return self.end_t - self.start_t
+
+    @property
+    def min_v(self) -> float:
+        return float(self._store.min_v[self._index])
+
+    @property
+    def min_t(self) -> pd.Timestamp:
+        return pd.Timestamp(self._store.min_t[self._index])
+
+    @property
+    def min_index(self) -> int:
+        return int(self._store.min_index[self._index])
+
+    @property
+    def max_v(self) -> float:
+        return float(self._store.max_v[self._index])
+
+    @property
+    def max_t(self) -> pd.Timestamp:
+        return pd.Timestamp(self._store.max_t[self._index])
+
+    @property
+    def max_index(self) -> int:
+        return int(self._store.max_index[self._index])
+
+    @property
+    def a(self) -> np.float64:
+        return self._store.coefficients[self._index, 0]
+
+    @property
+    def b(self) -> np.float64:
+        return self._store.coefficients[self._index, 1]
+
+    @property
+    def c(self) -> np.float64:
+        return self._store.coefficients[self._index, 2]
+
+    @property
+    def d(self) -> np.float64:
+        return self._store.coefficients[self._index, 3]
+
+    @property
+    def e(self) -> np.float64:
+        return self._store.coefficients[self._index, 4]
+
+    @property
+    def f(self) -> np.float64:
+        return self._store.coefficients[self._index, 5]
+
+    @property
+    def domain_start(self) -> int:
+        return -self.max_index
+
+    @property
+    def domain_end(self) -> int:
+        return int(self._store.length[self._index]) - 1 - self.max_index
@@ -0,0 +1,156 @@
+"""
+Module for the symbolic representation of the ripples. Every normalized graph is reduced to a short word- the mean
+of each of its segments (piecewise aggregate approximation, PAA), turned into a letter of a small alphabet (SAX)-
+and an inverted index from the words to the ripples gives the ripples of a similar shape without a scan of all of
+them. The candidates are then checked value by value
+"""
+
+import typing as t
+
+import numpy as np
+
+from ripple import Ripple
+from similarity import AlignedGraphs, min_close_count, pair_connections
+
+# the number of segments of a graph, and so of letters of its word
+WORD_LENGTH = 8
+
+# the number of letters of the alphabet
+ALPHABET_SIZE = 4
+
+
+def paa(graphs: t.List[np.ndarray], word_length: int = WORD_LENGTH) -> np.ndarray:
+    """
+    Function that returns the piecewise aggregate approximation of the graphs- the mean of each of word_length
+    segments of about the same length. A graph shorter than word_length has segments of one value, some of them
+    repeated.
+
+    Args:
+        graphs: list of float arrays, the normalized graphs
+        word_length: the number of segments
+
+    Returns:
+        float array of shape (graph count, word_length) with the means of the segments
+    """
+    length = np.array([len(graph) for graph in graphs], dtype=np.int64)
+    offset = np.cumsum(length) - length
+    cumulative = np.concatenate([[0.0], np.cumsum(np.concatenate(graphs) if graphs else np.empty(0))])
+
+    segment = np.arange(word_length)[None, :]
+    start = segment * length[:, None] // word_length
+    end = np.maximum((segment + 1) * length[:, None] // word_length, start + 1)
+
+    sums = cumulative[offset[:, None] + end] - cumulative[offset[:, None] + start]
+
+    return (sums / (end - start)).reshape(len(graphs), word_length)
+
+
+class SaxIndex:
+    """
+    Inverted index of the ripples by the SAX word of their normalized graph. The normalized graphs are divided by
+    their max and are not z-normalized, as the comparison of the graphs is done on those values, so the breakpoints
+    between the letters are the quantiles of the PAA values of all the ripples- every letter is about as frequent.
+    (graphs= the AlignedGraphs of the ripples| breakpoints= float array of alphabet size - 1 values| words= int8 array
+    of shape (ripple count, word length)| word_list= int8 array of the distinct words| word_ids= dict from the bytes
+    of a word to its row in word_list| posting_start/postings= int arrays, the ripples of the word i are
+    postings[posting_start[i]:posting_start[i+1]]| _min_count= dict of the min counts of min_close_count() by min
+    percent)
+    """
+
+    def __init__(self, ripple_list: t.List[Ripple], word_length: int = WORD_LENGTH,
+                 alphabet_size: int = ALPHABET_SIZE):
+        self.graphs = AlignedGraphs(ripple_list)
+        self.word_length = word_length
+
+        approximation = paa([np.asarray(ripple.normalized_graph, dtype=np.float64) for ripple in ripple_list],
+                            word_length=word_length)
+        if approximation.size:
+            self.breakpoints = np.quantile(approximation, np.arange(1, alphabet_size) / alphabet_size)
+        else:
+            self.breakpoints = np.linspace(0, 1, alphabet_size + 1)[1:-1]
+
+        self.words = self.encode(approximation)
+
+        self.word_list, inverse = np.unique(self.words.reshape(-1, word_length), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self.word_ids = {word.tobytes(): word_id for word_id, word in enumerate(self.word_list)}
+
+        self.postings = np.argsort(inverse, kind="stable")
+        self.posting_start = np.zeros(len(self.word_list) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(inverse, minlength=len(self.word_list)), out=self.posting_start[1:])
+
+        # the min counts of the lookups, by min percent
+        self._min_count = {}
+
+    def encode(self, approximation: np.ndarray) -> np.ndarray:
+        """
+        Method that turns PAA values into SAX words
+
+        Args:
+            approximation: float array of shape (graph count, word length), see paa()
+
+        Returns:
+            int8 array of the same shape with the letter of every segment, from 0 to alphabet size - 1
+        """
+        return np.searchsorted(self.breakpoints, approximation, side="right").astype(np.int8)
+
+    def ripples_of_word(self, word: np.ndarray) -> np.ndarray:
+        """Returns the sorted indexes of the ripples with the given word- a hash probe of the index"""
+        word_id = self.word_ids.get(np.asarray(word, dtype=np.int8).tobytes())
+        if word_id is None:
+            return np.empty(0, dtype=np.int64)
+
+        return np.sort(self.postings[self.posting_start[word_id]:self.posting_start[word_id + 1]])
+
+    def candidates(self, ripple_index: int, tolerance: int = 0) -> np.ndarray:
+        """
+        Method that returns the ripples with a word close to the one of a ripple, itself excluded
+
+        Args:
+            ripple_index: the index of the ripple
+            tolerance: the max difference of every letter- 0 only takes the ripples with the same word
+
+        Returns:
+            sorted int array of the indexes of the ripples
+        """
+        word = self.words[ripple_index]
+
+        if tolerance == 0:
+            found = self.ripples_of_word(word)
+        else:
+            # only the distinct words are checked, not the ripples
+            close = np.flatnonzero((np.abs(self.word_list.astype(np.int64) - word) <= tolerance).all(axis=1))
+            found = np.sort(np.concatenate([self.postings[self.posting_start[word_id]:self.posting_start[word_id + 1]]
+                                            for word_id in close.tolist()]))
+
+        return found[found != ripple_index]
+
+    def lookup(self, ripple_index: int, min_percent: float = 0.5, tolerance: int = 1) \
+            -> t.List[t.Tuple[float, int, int]]:
+        """
+        Method that finds the ripples that look like a ripple- the candidates of its word, checked value by value
+        like Analyze.compare_graphs() does
+
+        Args:
+            ripple_index: the index of the ripple
+            min_percent: the min percentage of a connection, for both ripples
+            tolerance: see candidates()
+
+        Returns:
+            the connections of the ripple, as a sorted list of tuples(percentage, origin, comparison)- the same
+            as in the connections of compare_graphs(), for the ripples that are candidates
+        """
+        found = self.candidates(ripple_index, tolerance=tolerance)
+        # the ripples of another max position class are never connected
+        found = found[self.graphs.max_position_class[found] == self.graphs.max_position_class[ripple_index]]
+
+        if min_percent > 0 and min_percent not in self._min_count:
+            self._min_count[min_percent] = min_close_count(self.graphs.length, min_percent)
+
+        origin = np.full(len(found), ripple_index)
+        counts = self.graphs.count_pair_close_values(origin, found, min_count=self._min_count.get(min_percent))
+        connected = counts > 0
+        _, others, percents, _ = pair_connections(self.graphs, origin[connected], found[connected], counts[connected],
+                                                  min_percent)
+
+        return sorted(zip(percents.tolist(), [ripple_index] * len(others), others.tolist()))
@@ -0,0 +1,584 @@
+"""
+Module for comparing the normalized graphs of many ripples at once. The graphs are packed in one 2-D array, aligned
+on the position of their max value, so the comparison of Analyze._compare_two_graphs() is done for whole blocks of
+pairs at a time
+"""
+
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from connection_matrix import ConnectionMatrix, build_connection_matrix
+from ripple import Ripple, round_values
+
+# relative tolerance of two values to be considered close, as in Analyze._compare_two_graphs()
+REL_TOL = 0.05
+
+# max number of values compared in one block of pairs- it bounds the memory used by the comparison
+BLOCK_ELEMENTS = 2_000_000
+
+# number of columns compared at a time when the pairs below a min count are dropped along the way
+CHUNK_COLUMNS = 8
+
+# the position of the max value in a graph- the pairs of graphs in different classes are not comparable
+MAX_AT_START = 0
+MAX_AT_END = 1
+MAX_AT_CENTER = 2
+
+# the buckets of CandidateIndex- the lengths of the graphs in a length bucket are at most this many times apart,
+# and the lowest values in an amplitude bucket are within 1/AMPLITUDE_BUCKETS
+LENGTH_BUCKET_RATIO = 1.25
+AMPLITUDE_BUCKETS = 10
+
+# the number of tiles per worker process the pairs are split in- the workers that finish early take more of them
+TILES_PER_WORKER = 8
+
+# with a top k, the connections found so far are trimmed to the k best ones of each ripple every this many of them
+COMPACT_CONNECTIONS = 4_000_000
+
+
+class AlignedGraphs:
+    """
+    Object that stores the normalized graphs of a list of ripples in one array, one row per ripple, aligned so
+    that the column `center` holds the max value of each of them. The positions a ripple does not cover are NaN.
+    (values= float array of shape (ripple count, width)| center= int column of the max values| length= int array of
+    the length of each graph| max_position_class= int array with MAX_AT_START/MAX_AT_END/MAX_AT_CENTER per ripple)
+
+    The last value of every graph is left out, because the compared interval of two graphs never includes it- see
+    Analyze._compare_two_graphs(), where the end index of the slices is the last index of the shorter part. With
+    that, the values two rows have in the same columns are exactly the ones compared for that pair.
+    """
+
+    def __init__(self, ripple_list: t.List[Ripple]):
+        self.length = np.array([len(ripple.normalized_graph) for ripple in ripple_list], dtype=np.int64)
+        max_index = np.array([ripple.max_index for ripple in ripple_list], dtype=np.int64)
+        end_index = self.length - 1
+        # the number of columns each row has before and after (and with) its max
+        self.before = max_index
+        self.after = end_index - max_index
+
+        self.max_position_class = np.full(len(ripple_list), MAX_AT_CENTER, dtype=np.int8)
+        self.max_position_class[max_index == end_index] = MAX_AT_END
+        # a graph of one value is checked as max at start first, and compares with nothing anyway
+        self.max_position_class[max_index == 0] = MAX_AT_START
+
+        self.center = int(max_index.max(initial=0))
+        width = self.center + int((end_index - max_index).max(initial=0))
+        self.values = np.full((len(ripple_list), width), np.nan, dtype=np.float64)
+
+        for row, ripple in enumerate(ripple_list):
+            start = self.center - max_index[row]
+            self.values[row, start:start + end_index[row]] = ripple.normalized_graph[:-1]
+
+    def __len__(self) -> int:
+        return len(self.length)
+
+    def count_close_values(self, rows: np.ndarray, columns: np.ndarray,
+                           min_count: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Method that counts, for every pair of a row ripple and a column ripple, the values of the compared interval
+        that are close, with the same tolerance as math.isclose(rel_tol=REL_TOL). The max position classes are not
+        checked here.
+
+        Args:
+            rows/columns: int arrays of ripple indexes
+            min_count: int array with the min number of close values of a pair for each ripple (a pair needs the
+                    larger of its two), see min_close_count(). The pairs that can not reach it are dropped as soon
+                    as that is known, and counted as 0. None counts all the pairs in full
+
+        Returns:
+            int array of shape (len(rows), len(columns)) with the number of close values
+        """
+        if min_count is not None:
+            return self._count_close_values_bounded(rows, columns, min_count)
+
+        # only the columns where some of the ripples have values
+        covered = ~np.isnan(self.values[rows]).all(axis=0) & ~np.isnan(self.values[columns]).all(axis=0)
+        graphs_a = self.values[rows][:, covered][:, None, :]
+        graphs_b = self.values[columns][:, covered][None, :, :]
+
+        # the normalized values are positive, so the larger one is the larger in absolute value; NaN is never close
+        close = np.abs(graphs_a - graphs_b) <= REL_TOL * np.maximum(graphs_a, graphs_b)
+
+        return close.sum(axis=2)
+
+    def _count_close_values_bounded(self, rows: np.ndarray, columns: np.ndarray, min_count: np.ndarray) -> np.ndarray:
+        """
+        Method that counts the close values like count_close_values(), a few columns at a time, and stops counting
+        a pair as soon as the columns left of its interval can no longer bring it to its min count
+        """
+        counts = self.count_pair_close_values(np.repeat(rows, len(columns)), np.tile(columns, len(rows)),
+                                              min_count=min_count)
+
+        return counts.reshape(len(rows), len(columns))
+
+    def count_pair_close_values(self, pair_a: np.ndarray, pair_b: np.ndarray,
+                                min_count: t.Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Method that counts the close values of a list of pairs, like count_close_values(), a few columns at a
+        time. The max position classes are not checked here.
+
+        Args:
+            pair_a/pair_b: int arrays with the two ripple indexes of every pair
+            min_count: see count_close_values(). None counts all the pairs in full
+
+        Returns:
+            int array with the number of close values of every pair
+        """
+        if min_count is None:
+            required = np.zeros(len(pair_a), dtype=np.int64)
+        else:
+            required = np.maximum(min_count[pair_a], min_count[pair_b])
+
+        # the compared interval of each pair, as columns of the array- the end is not included
+        first = self.center - np.minimum(self.before[pair_a], self.before[pair_b])
+        end = self.center + np.minimum(self.after[pair_a], self.after[pair_b])
+
+        counts = np.zeros(len(pair_a), dtype=np.int64)
+        active = np.flatnonzero(end - first >= required)
+
+        if len(active):
+            for chunk_start in range(int(first[active].min()), int(end[active].max()), CHUNK_COLUMNS):
+                chunk_end = chunk_start + CHUNK_COLUMNS
+                graphs_a = self.values[pair_a[active], chunk_start:chunk_end]
+                graphs_b = self.values[pair_b[active], chunk_start:chunk_end]
+                counts[active] += (np.abs(graphs_a - graphs_b) <= REL_TOL * np.maximum(graphs_a, graphs_b)).sum(axis=1)
+
+                left = np.maximum(end[active] - np.maximum(first[active], chunk_end), 0)
+                reachable = counts[active] + left >= required[active]
+                counts[active[~reachable]] = 0
+                active = active[reachable]
+
+                if len(active) == 0:
+                    break
+
+        return counts
+
+
+def min_close_count(length: np.ndarray, min_percent: float) -> np.ndarray:
+    """
+    Function that returns, for graphs of the given lengths, the min number of close values for which the rounded
+    percentage round(count / length, 2) of Analyze._compare_ripple_items() reaches min_percent- at least 1
+
+    Args:
+        length: int array of the lengths of the graphs
+        min_percent: the min percentage
+
+    Returns:
+        int array of the min number of close values per graph
+    """
+    length = np.maximum(np.asarray(length, dtype=np.int64), 1)
+    count = np.maximum(np.floor((min_percent - 0.01) * length), 1)
+
+    while True:
+        # a count above the length can not be reached anyway
+        short = (round_values(count / length, 2) < min_percent) & (count <= length)
+        if not short.any():
+            return count.astype(np.int64)
+        count[short] += 1
+
+
+class CandidateIndex:
+    """
+    Index of the ripples of an AlignedGraphs, in buckets by max position class, length and amplitude- the lowest
+    normalized value. Only the pairs of buckets that can still reach the min percentage are compared, the same for
+    both ripples of a pair (see find_connections()), and the others are counted as skipped.
+
+    The bounds of a pair of buckets are upper bounds of the count of close values of any of their pairs:
+    - the compared interval is shorter than the shorter graph, so the count is less than the shorter length
+    - a value is close only to values of at most 1/(1-REL_TOL) times itself, so the count is at most the number of
+      values of a graph that are close to the lowest value of the other bucket, or larger
+    Graphs in different max position classes are never compared.
+
+    (bucket= int array with the bucket of each ripple| compared_pairs/skipped_by_max_position/skipped_by_bounds=
+    number of pairs of the last candidate_blocks())
+    """
+
+    def __init__(self, graphs: AlignedGraphs, min_percent: float = 0.0):
+        self.graphs = graphs
+        self.min_percent = min_percent
+
+        length_bucket = np.floor(np.log(np.maximum(graphs.length, 1)) / np.log(LENGTH_BUCKET_RATIO)).astype(np.int64)
+        # the lowest compared value of each graph- the graphs that compare no values are put in the last bucket
+        lowest = np.where(np.isnan(graphs.values), np.inf, graphs.values).min(axis=1, initial=np.inf)
+        amplitude_bucket = np.minimum(np.floor(lowest * AMPLITUDE_BUCKETS), AMPLITUDE_BUCKETS).astype(np.int64)
+
+        keys = np.stack([graphs.max_position_class.astype(np.int64), length_bucket, amplitude_bucket], axis=1)
+        bucket_keys, self.bucket = np.unique(keys.reshape(-1, 3), axis=0, return_inverse=True)
+        self.bucket = self.bucket.reshape(-1)
+
+        self.members = [np.flatnonzero(self.bucket == bucket) for bucket in range(len(bucket_keys))]
+        self._bucket_class = bucket_keys[:, 0]
+        self._bucket_amplitude = bucket_keys[:, 2]
+        self._min_length = np.array([graphs.length[members].min() for members in self.members], dtype=np.int64)
+        self._max_length = np.array([graphs.length[members].max() for members in self.members], dtype=np.int64)
+
+        # reach[bucket, k]- the highest share of values of a graph of the bucket that can be close to a value of
+        # at least k/AMPLITUDE_BUCKETS; a little lower threshold, so rounding never leaves a close value out
+        reach = np.empty((len(graphs), AMPLITUDE_BUCKETS + 1), dtype=np.float64)
+        for k in range(AMPLITUDE_BUCKETS + 1):
+            threshold = (1 - REL_TOL) * k / AMPLITUDE_BUCKETS * (1 - 1e-9)
+            reach[:, k] = (graphs.values >= threshold).sum(axis=1) / np.maximum(graphs.length, 1)
+        self._reach = np.zeros((len(self.members), AMPLITUDE_BUCKETS + 1), dtype=np.float64)
+        for bucket, members in enumerate(self.members):
+            self._reach[bucket] = reach[members].max(axis=0)
+
+        self.compared_pairs = 0
+        self.skipped_by_max_position = 0
+        self.skipped_by_bounds = 0
+
+    def _can_reach(self, bucket_a: int, bucket_b: int) -> bool:
+        """Returns False if no pair of the two buckets can reach min_percent for both of its ripples"""
+        if self.min_percent <= 0:
+            return True
+
+        # the percentages are rounded to 2 decimals
+        cutoff = self.min_percent - 0.005 - 1e-9
+        length_bound = (min(self._max_length[bucket_a], self._max_length[bucket_b]) - 1) / \
+            max(self._min_length[bucket_a], self._min_length[bucket_b])
+
+        return (length_bound >= cutoff and self._reach[bucket_a, self._bucket_amplitude[bucket_b]] >= cutoff
+                and self._reach[bucket_b, self._bucket_amplitude[bucket_a]] >= cutoff)
+
+    def _count_pairs(self, bucket_a: int, bucket_b: int, first_new_index: int) -> int:
+        """Returns the number of pairs of two buckets that contain at least one ripple from first_new_index on"""
+        size_a = len(self.members[bucket_a])
+        old_a = int((self.members[bucket_a] < first_new_index).sum())
+
+        if bucket_a == bucket_b:
+            return size_a * (size_a - 1) // 2 - old_a * (old_a - 1) // 2
+
+        size_b = len(self.members[bucket_b])
+        old_b = int((self.members[bucket_b] < first_new_index).sum())
+
+        return size_a * size_b - old_a * old_b
+
+    def candidate_blocks(self, first_new_index: int = 0) -> t.Iterator[t.Tuple[np.ndarray, np.ndarray]]:
+        """
+        Method that goes through the buckets and returns, for each of them, the ripples that are paired with its
+        ripples- the ones of the same bucket and of the later buckets that can reach min_percent. The pairs of
+        ripples in the same bucket are all there twice, and the ones before first_new_index are there too,
+        so they are left out by the caller (see _count_pairs_by_block()).
+
+        Args:
+            first_new_index: index of the first ripple that was not compared yet
+
+        Yields:
+            (rows, columns): int arrays with the ripples of the bucket and the ones they are paired with
+        """
+        ripple_count = len(self.graphs)
+        first_new_index = min(first_new_index, ripple_count)
+        all_pairs = ripple_count * (ripple_count - 1) // 2 - first_new_index * (first_new_index - 1) // 2
+        class_pairs = 0
+        self.compared_pairs = 0
+        self.skipped_by_bounds = 0
+
+        for bucket_a in range(len(self.members)):
+            partners = []
+
+            for bucket_b in range(bucket_a, len(self.members)):
+                if self._bucket_class[bucket_b] != self._bucket_class[bucket_a]:
+                    continue
+
+                pair_count = self._count_pairs(bucket_a, bucket_b, first_new_index)
+                class_pairs += pair_count
+
+                if self._can_reach(bucket_a, bucket_b):
+                    partners.append(self.members[bucket_b])
+                    self.compared_pairs += pair_count
+                else:
+                    self.skipped_by_bounds += pair_count
+
+            if partners:
+                yield self.members[bucket_a], np.sort(np.concatenate(partners))
+
+        self.skipped_by_max_position = all_pairs - class_pairs
+
+    def report(self) -> t.Dict[str, int]:
+        """Returns the number of pairs compared and skipped by the last candidate_blocks()"""
+        return {"compared pairs": self.compared_pairs,
+                "skipped pairs": self.skipped_by_max_position + self.skipped_by_bounds,
+                "skipped by max position": self.skipped_by_max_position,
+                "skipped by bounds": self.skipped_by_bounds}
+
+
+def find_connections(graphs: AlignedGraphs, first_new_index: int = 0, min_percent: float = 0.0,
+                     index: t.Optional[CandidateIndex] = None, top_k: t.Optional[int] = None,
+                     workers: t.Optional[int] = None) -> t.List[t.List[t.Tuple[float, int, int]]]:
+    """
+    Function that returns the connections of find_connection_matrix() as the list of lists of tuples(percentage,
+    origin, comparison) of Analyze.compare_graphs(), sorted
+    """
+    return find_connection_matrix(graphs, first_new_index=first_new_index, min_percent=min_percent, index=index,
+                                  top_k=top_k, workers=workers).to_lists()
+
+
+def find_connection_matrix(graphs: AlignedGraphs, first_new_index: int = 0, min_percent: float = 0.0,
+                           index: t.Optional[CandidateIndex] = None, top_k: t.Optional[int] = None,
+                           workers: t.Optional[int] = None) -> ConnectionMatrix:
+    """
+    Function that compares all the pairs of graphs and returns the same connections as Analyze.compare_graphs()
+    does pair by pair. With a min percent, only the connections where both percentages reach it are kept, and the
+    pairs that can not reach it are not compared. With top_k, only the k best connections of each ripple are kept-
+    the connections found so far are trimmed to them every COMPACT_CONNECTIONS connections.
+
+    With more than one worker, the pairs are split in tiles of about the same number of pairs that are compared
+    by a pool of processes, reading the graphs from shared memory. The tiles come back in order and the matrix
+    is sorted when it is built, so the connections are the same as with one worker.
+
+    Args:
+        graphs: the AlignedGraphs of the ripples
+        first_new_index: index of the first ripple that was not compared yet- only the pairs that contain
+                        at least one ripple from this index on are compared. 0 compares all the pairs
+        min_percent: the min percentage of a connection, for both ripples. 0 keeps all the connections
+        index: the CandidateIndex of the graphs, which counts the compared and skipped pairs. None makes one
+        top_k: the max number of connections kept per ripple. None keeps all of them
+        workers: the number of worker processes. None or 1 compares the pairs in this process
+
+    Returns:
+        the ConnectionMatrix of the connections
+    """
+    if index is None:
+        index = CandidateIndex(graphs, min_percent=min_percent)
+
+    # with a min percent, the pairs are dropped as soon as they can not reach it
+    min_count = min_close_count(graphs.length, min_percent) if min_percent > 0 else None
+
+    if workers is None or workers <= 1:
+        tiles = pair_tiles(graphs, index, first_new_index)
+        results = (_compare_tile(graphs, tile, first_new_index, min_percent, min_count) for tile in tiles)
+    else:
+        tiles = pair_tiles(graphs, index, first_new_index, tile_count=workers * TILES_PER_WORKER)
+        results = _compare_tiles_in_parallel(graphs, tiles, first_new_index, min_percent, min_count, workers)
+
+    # every connection is kept for both of its ripples, as (origin, comparison, percentage of the origin)
+    origins, comparisons, scores = [], [], []
+    pending = 0
+
+    for index1, index2, percent1, percent2 in results:
+        index1, index2 = index1.astype(np.int32), index2.astype(np.int32)
+        origins += [index1, index2]
+        comparisons += [index2, index1]
+        scores += [percent1.astype(np.float32), percent2.astype(np.float32)]
+        pending += 2 * len(index1)
+
+        if top_k is not None and pending > max(COMPACT_CONNECTIONS, 2 * top_k * len(graphs)):
+            matrix = build_connection_matrix(len(graphs), np.concatenate(origins), np.concatenate(comparisons),
+                                             np.concatenate(scores), top_k=top_k)
+            origins, comparisons, scores = [[item] for item in matrix.to_coo()]
+            pending = matrix.connection_count
+
+    if not origins:
+        return build_connection_matrix(len(graphs), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32),
+                                       np.empty(0, dtype=np.float32))
+
+    return build_connection_matrix(len(graphs), np.concatenate(origins), np.concatenate(comparisons),
+                                   np.concatenate(scores), top_k=top_k)
+
+
+def find_pair_connections(graphs: AlignedGraphs, index1: np.ndarray, index2: np.ndarray, min_percent: float = 0.0,
+                          top_k: t.Optional[int] = None) -> ConnectionMatrix:
+    """
+    Function that compares only the given pairs of graphs, with the same result for each of them as
+    find_connection_matrix()- it is meant for the candidate pairs of an index. Every pair is compared once, in
+    any order, and the pairs of a graph with itself or with a graph of another max position class are skipped.
+
+    Args:
+        graphs: the AlignedGraphs of the ripples
+        index1/index2: int arrays with the two ripple indexes of every pair
+        min_percent/top_k: see find_connection_matrix()
+
+    Returns:
+        the ConnectionMatrix of the connections of the pairs
+    """
+    index1 = np.asarray(index1, dtype=np.int64)
+    index2 = np.asarray(index2, dtype=np.int64)
+
+    # every pair once, as (smaller, larger)
+    pairs = np.unique(np.minimum(index1, index2) * len(graphs) + np.maximum(index1, index2))
+    index1, index2 = pairs // len(graphs), pairs % len(graphs)
+    comparable = (index1 != index2) & (graphs.max_position_class[index1] == graphs.max_position_class[index2])
+    index1, index2 = index1[comparable], index2[comparable]
+
+    min_count = min_close_count(graphs.length, min_percent) if min_percent > 0 else None
+    block_pairs = max(1, BLOCK_ELEMENTS // max(graphs.values.shape[1], 1))
+
+    origins, comparisons, scores = [], [], []
+
+    for position in range(0, len(index1), block_pairs):
+        pair_a = index1[position:position + block_pairs]
+        pair_b = index2[position:position + block_pairs]
+        counts = graphs.count_pair_close_values(pair_a, pair_b, min_count=min_count)
+
+        connected = counts > 0
+        found1, found2, percent1, percent2 = pair_connections(graphs, pair_a[connected], pair_b[connected],
+                                                              counts[connected], min_percent)
+        origins += [found1, found2]
+        comparisons += [found2, found1]
+        scores += [percent1, percent2]
+
+    if not origins:
+        return build_connection_matrix(len(graphs), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32),
+                                       np.empty(0, dtype=np.float32))
+
+    return build_connection_matrix(len(graphs), np.concatenate(origins), np.concatenate(comparisons),
+                                   np.concatenate(scores), top_k=top_k)
+
+
+def merge_connections(connections: t.List[t.List[t.Tuple[float, int, int]]],
+                      new_connections: t.List[t.List[t.Tuple[float, int, int]]],
+                      top_k: t.Optional[int] = None) -> None:
+    """
+    Function that merges the connections of a comparison of new ripples (see find_connections() with a
+    first_new_index) into the connections of the ripples before them. The lists of the new ripples are added at the
+    end, and every list stays sorted.
+
+    Args:
+        connections: the sorted lists of connections of the ripples that were compared before, changed in place
+        new_connections: the sorted lists of connections of all the ripples, old and new
+        top_k: the max number of connections kept per ripple- the best ones. None keeps all of them
+    """
+    connections.extend([] for _ in range(len(new_connections) - len(connections)))
+
+    for item, new_item in zip(connections, new_connections):
+        if new_item:
+            # two sorted runs, which sort() merges in linear time
+            item.extend(new_item)
+            item.sort()
+        if top_k is not None and len(item) > top_k:
+            del item[:len(item) - top_k]
+
+
+def pair_tiles(graphs: AlignedGraphs, index: CandidateIndex, first_new_index: int = 0,
+               tile_count: t.Optional[int] = None) -> t.List[t.Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Function that splits the pairs of the candidate blocks of a CandidateIndex in tiles of consecutive rows of a
+    bucket with their partners. A pair inside the bucket is counted only as (i, j) with i < j, and a pair with both
+    ripples before first_new_index is not counted- see _compare_tile()
+
+    Args:
+        graphs: the AlignedGraphs of the ripples
+        index: the CandidateIndex of the graphs
+        first_new_index: index of the first ripple that was not compared yet
+        tile_count: the number of tiles the pairs are split in, at least- every tile gets about the same number of
+                    pairs. None only splits the blocks that are too big to compare at once, see BLOCK_ELEMENTS
+
+    Returns:
+        list of (rows, columns, in_bucket): the ripple indexes of the tile and a bool array that marks the columns
+                                            in the bucket of the rows
+    """
+    blocks = list(index.candidate_blocks(first_new_index))
+    width = max(graphs.values.shape[1], 1)
+    max_pairs = -(-index.compared_pairs // tile_count) if tile_count else None
+
+    tiles = []
+    for members, partners in blocks:
+        block_rows = max(1, BLOCK_ELEMENTS // (max(len(partners), 1) * width))
+        if max_pairs is not None:
+            block_rows = max(1, min(block_rows, max_pairs // max(len(partners), 1)))
+        same_bucket = index.bucket[partners] == index.bucket[members[0]]
+
+        for position in range(0, len(members), block_rows):
+            rows = members[position:position + block_rows]
+
+            # the rows that are all old are only paired with the new ripples
+            if rows[-1] >= first_new_index:
+                columns, in_bucket = partners, same_bucket
+            else:
+                columns = partners[partners >= first_new_index]
+                in_bucket = same_bucket[partners >= first_new_index]
+
+            if len(columns):
+                tiles.append((rows, columns, in_bucket))
+
+    return tiles
+
+
+def _compare_tile(graphs: AlignedGraphs, tile: t.Tuple[np.ndarray, np.ndarray, np.ndarray], first_new_index: int,
+                  min_percent: float, min_count: t.Optional[np.ndarray]) \
+        -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function that compares the pairs of a tile of pair_tiles() and returns its connections as arrays
+
+    Returns:
+        (index1, index2, percent1, percent2): the ripples of every connection and the percentage of each of them
+    """
+    rows, columns, in_bucket = tile
+
+    counts = graphs.count_close_values(rows, columns, min_count=min_count)
+    counts[in_bucket[None, :] & (columns[None, :] <= rows[:, None])] = 0
+    counts[np.maximum(columns[None, :], rows[:, None]) < first_new_index] = 0
+
+    row_index, column_index = np.nonzero(counts)
+
+    return pair_connections(graphs, rows[row_index], columns[column_index], counts[row_index, column_index],
+                            min_percent)
+
+
+def pair_connections(graphs: AlignedGraphs, index1: np.ndarray, index2: np.ndarray, count: np.ndarray,
+                     min_percent: float) -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Function that turns the counts of close values of pairs into connections- the pairs where both percentages
+    are not 0 and reach min_percent, as (index1, index2, percent1, percent2) arrays
+    """
+    percent1 = round_values(count / graphs.length[index1], 2)
+    percent2 = round_values(count / graphs.length[index2], 2)
+    kept = (percent1 != 0) & (percent2 != 0) & (percent1 >= min_percent) & (percent2 >= min_percent)
+
+    return index1[kept], index2[kept], percent1[kept], percent2[kept]
+
+
+def _compare_tiles_in_parallel(graphs: AlignedGraphs, tiles: t.List[t.Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                               first_new_index: int, min_percent: float, min_count: t.Optional[np.ndarray],
+                               workers: int) -> t.Iterator[t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Function that compares the tiles in a pool of processes. The values of the graphs are copied once to shared
+    memory, where every worker reads them, and the results are yielded in the order of the tiles
+    """
+    shared = shared_memory.SharedMemory(create=True, size=max(graphs.values.nbytes, 1))
+    try:
+        np.ndarray(graphs.values.shape, dtype=graphs.values.dtype, buffer=shared.buf)[:] = graphs.values
+
+        shared_graphs = (shared.name, graphs.values.shape, graphs.length, graphs.before, graphs.after,
+                         graphs.max_position_class, graphs.center)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared_graphs, first_new_index, min_percent, min_count)) as executor:
+            # one tile at a time, so the workers that are done with theirs take the next one
+            yield from executor.map(_compare_worker_tile, tiles, chunksize=1)
+    finally:
+        shared.close()
+        shared.unlink()
+
+
+# the state of a worker process of _compare_tiles_in_parallel()
+_worker = {}
+
+
+def _init_worker(shared_graphs: tuple, first_new_index: int, min_percent: float,
+                 min_count: t.Optional[np.ndarray]) -> None:
+    """
+    Function that attaches a worker process to the graphs in shared memory
+    """
+    name, shape, length, before, after, max_position_class, center = shared_graphs
+    shared = shared_memory.SharedMemory(name=name)
+
+    graphs = AlignedGraphs([])
+    graphs.values = np.ndarray(shape, dtype=np.float64, buffer=shared.buf)
+    graphs.length = length
+    graphs.before = before
+    graphs.after = after
+    graphs.max_position_class = max_position_class
+    graphs.center = center
+
+    # the shared memory is kept open as long as the worker uses the graphs
+    _worker.update(shared=shared, graphs=graphs, first_new_index=first_new_index, min_percent=min_percent,
+                   min_count=min_count)
+
+
+def _compare_worker_tile(tile: t.Tuple[np.ndarray, np.ndarray, np.ndarray]) \
+        -> t.Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Function that compares a tile in a worker process, see _compare_tile()"""
+    return _compare_tile(_worker["graphs"], tile, _worker["first_new_index"], _worker["min_percent"],
+                         _worker["min_count"])
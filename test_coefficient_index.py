@@ -0,0 +1,72 @@
+"""
+Tests that the KD-tree of coefficient_index finds the same nearest points as a brute force search, and that the
+candidate pairs are compared as in the exact comparison
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import coefficient_index
+from coefficient_index import CoefficientIndex, KDTree
+from data_division import Divide
+from similarity import AlignedGraphs, find_connection_matrix
+
+
+def _points(kind, count, seed=0):
+    """Returns points for the tree- some kinds with many points at the same place"""
+    rng = np.random.default_rng(seed)
+
+    if kind == "duplicates":
+        return rng.normal(size=(count // 4 + 1, 3)).repeat(4, axis=0)[:count]
+    if kind == "grid":
+        return rng.integers(0, 3, size=(count, 2)).astype(np.float64)
+    return rng.normal(size=(count, 5))
+
+
+@pytest.mark.parametrize("kind", ["random", "duplicates", "grid"])
+@pytest.mark.parametrize("count", [1, 10, 300, 1000])
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_nearest_matches_brute_force(kind, count, k):
+    points = _points(kind, count)
+    neighbours, distances = KDTree(points).nearest(k)
+
+    squared = ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+    np.fill_diagonal(squared, np.inf)
+    expected = np.sort(squared, axis=1)[:, :min(k, count - 1)]
+
+    assert neighbours.shape == expected.shape
+    assert np.allclose(distances, expected)
+    # among equal distances any neighbour is right, so the neighbours are checked by their distance
+    assert (neighbours != np.arange(count)[:, None]).all()
+    assert np.allclose(np.take_along_axis(squared, neighbours, axis=1), distances)
+    assert all(len(set(row)) == len(row) for row in neighbours.tolist())
+
+
+def _ripples():
+    rng = np.random.default_rng(5)
+    time = np.arange(6000)
+    values = np.round(150 + 60 * np.sin(time / 14) + 20 * np.sin(time / 5.3) + rng.integers(-5, 6, len(time)))
+    glucose = pd.DataFrame({"Timestamp": pd.date_range("2023-01-01", periods=len(values), freq="5min"),
+                            "Glucose Value (mg/dL)": values})
+
+    d = Divide(glucose=glucose)
+    trend_list = d.trend_setting()
+    return d.generate_ripple_store(trend_list, d.parting(trend_list, 1)).ripples()
+
+
+@pytest.mark.parametrize("min_percent", [0.0, 0.7])
+def test_all_candidates_find_the_exact_connections(min_percent):
+    ripple_list = _ripples()
+    index = CoefficientIndex(ripple_list)
+    exact = find_connection_matrix(AlignedGraphs(ripple_list), min_percent=min_percent)
+
+    # every ripple has all the ripples of its class as candidates
+    found = index.find_connections(len(ripple_list), min_percent=min_percent)
+    assert found.to_lists() == exact.to_lists()
+
+    report = coefficient_index.recall_report(ripple_list, candidate_counts=(3, len(ripple_list)),
+                                             min_percent=min_percent)
+    assert report[0]["connections"] == exact.connection_count
+    assert 0 <= report[1]["recall"] <= 1
+    assert report[2]["recall"] == 1.0 and report[2]["best match recall"] == 1.0
@@ -0,0 +1,66 @@
+"""
+Tests that Divide.parting_by_runs() divides the glucose values exactly as Divide.parting_with_state()
+"""
+
+import typing as t
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_division import Divide
+
+# the thresholds every series is divided with
+THRESHOLDS = (1, 2, 3)
+
+# the number of glucose values of every series
+SERIES_LENGTH = 3000
+
+
+def _divide(values: np.ndarray) -> Divide:
+    """Returns a Divide with the glucose values given, one every 5 minutes"""
+    glucose = pd.DataFrame({"Timestamp": pd.date_range("2023-01-01", periods=len(values), freq="5min"),
+                            "Glucose Value (mg/dL)": np.asarray(values, dtype=np.int64)})
+    return Divide(glucose=glucose)
+
+
+def _series() -> t.Dict[str, np.ndarray]:
+    """Returns the glucose series the divisions are compared on"""
+    rng = np.random.default_rng(7)
+    time = np.arange(SERIES_LENGTH)
+
+    return {
+        "random": np.clip(120 + np.cumsum(rng.integers(-6, 7, SERIES_LENGTH)), 40, 400),
+        "flat": np.full(SERIES_LENGTH, 110),
+        "monotone": 40 + time // 10,
+        "sinusoidal": np.round(140 + 60 * np.sin(time / 15) + rng.integers(-2, 3, SERIES_LENGTH)),
+    }
+
+
+@pytest.mark.parametrize("name", list(_series()))
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_parting_by_runs_matches_parting_with_state(name, threshold):
+    d = _divide(_series()[name])
+    trend_list = d.trend_setting()
+
+    assert d.parting_by_runs(trend_list, threshold) == d.parting_with_state(trend_list, threshold)
+
+
+@pytest.mark.parametrize("name", ["random", "sinusoidal"])
+@pytest.mark.parametrize("threshold", THRESHOLDS)
+def test_parting_by_runs_resumes_from_cut_state(name, threshold):
+    values = _series()[name]
+    d = _divide(values)
+    trend_list = d.trend_setting()
+    trend_list_count, cut_states = d.parting_with_state(trend_list, threshold)
+    assert len(trend_list_count) > 2
+
+    # resume from every cut, with the values after it only
+    cut_positions = np.cumsum(trend_list_count).tolist()
+    for cut, (position, state) in enumerate(zip(cut_positions, cut_states)):
+        rest = _divide(values[position:])
+        rest_trend_list = rest.trend_setting()
+
+        expected = rest.parting_with_state(rest_trend_list, threshold, *state)
+        assert rest.parting_by_runs(rest_trend_list, threshold, *state) == expected
+        assert expected[0] == trend_list_count[cut + 1:]
@@ -0,0 +1,94 @@
+"""
+Tests that the banded DTW of DTWGraphs and the pruning of find_dtw_connections() give the same results as a plain DTW
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dtw
+from data_division import Divide
+
+# the half widths of the band the DTW is tested with
+BAND_RATIOS = (0, 0.1, 0.3)
+
+
+def _ripples():
+    """Returns the ripples of a glucose series made of waves of different periods and heights, with noise"""
+    rng = np.random.default_rng(11)
+    time = np.arange(8000)
+    period = np.repeat(rng.uniform(8, 25, len(time) // 400 + 1), 400)[:len(time)]
+    values = np.round(150 + 60 * np.sin(np.cumsum(1 / period)) + rng.integers(-5, 6, len(time)))
+    glucose = pd.DataFrame({"Timestamp": pd.date_range("2023-01-01", periods=len(values), freq="5min"),
+                            "Glucose Value (mg/dL)": values})
+
+    d = Divide(glucose=glucose)
+    trend_list = d.trend_setting()
+    return d.generate_ripple_store(trend_list, d.parting(trend_list, 1)).ripples()
+
+
+def _plain_dtw(a, b, window):
+    """Returns the DTW distance of a and b- the full cost matrix, with the cells out of the band at inf"""
+    size = len(a)
+    cost = [[math.inf] * size for _ in range(size)]
+
+    for i in range(size):
+        for j in range(max(0, i - window), min(size, i + window + 1)):
+            difference = (a[i] - b[j]) ** 2
+            if i == 0 and j == 0:
+                cost[i][j] = difference
+                continue
+            cost[i][j] = difference + min(cost[i - 1][j] if i > 0 else math.inf,
+                                          cost[i - 1][j - 1] if i > 0 and j > 0 else math.inf,
+                                          cost[i][j - 1] if j > 0 else math.inf)
+
+    return cost[-1][-1]
+
+
+@pytest.mark.parametrize("band_ratio", BAND_RATIOS)
+def test_distance_matches_plain_dtw(band_ratio):
+    graphs = dtw.DTWGraphs(_ripples(), band_ratio=band_ratio)
+    pair_a, pair_b = np.triu_indices(len(graphs), 1)
+    distance = graphs.distance(pair_a, pair_b)
+
+    for pair in np.random.default_rng(0).choice(len(pair_a), 150, replace=False).tolist():
+        expected = _plain_dtw(graphs.values[pair_a[pair]], graphs.values[pair_b[pair]], graphs.window)
+        assert math.isclose(distance[pair], expected, rel_tol=1e-9, abs_tol=1e-12)
+
+    # the lower bounds are never above the distance
+    assert (graphs.lb_kim(pair_a, pair_b) <= distance + 1e-12).all()
+    assert (graphs.lb_keogh(pair_a, pair_b) <= distance + 1e-12).all()
+    assert (graphs.lb_keogh(pair_b, pair_a) <= distance + 1e-12).all()
+
+    # with a cutoff, the distances above it are inf and the others do not change
+    cutoff = float(np.median(distance))
+    cut = graphs.distance(pair_a, pair_b, cutoff=cutoff)
+    assert np.array_equal(cut, np.where(distance <= cutoff, distance, np.inf))
+
+
+@pytest.mark.parametrize("band_ratio", BAND_RATIOS)
+@pytest.mark.parametrize("min_similarity", [0.8, 0.9])
+def test_pruned_connections_match_all_pairs(band_ratio, min_similarity):
+    graphs = dtw.DTWGraphs(_ripples(), band_ratio=band_ratio)
+    matrix, report = dtw.find_dtw_connections(graphs, min_similarity=min_similarity)
+
+    # every pair compared without pruning
+    pair_a, pair_b = np.triu_indices(len(graphs), 1)
+    similarity = graphs.similarity(graphs.distance(pair_a, pair_b))
+    length = graphs.length
+    stretch = np.maximum(length[pair_a], length[pair_b]) <= dtw.MAX_STRETCH * np.minimum(length[pair_a],
+                                                                                       length[pair_b])
+    connected = stretch & (similarity >= min_similarity) & (similarity > 0)
+
+    expected = sorted([(float(score), int(a), int(b)) for score, a, b in
+                       zip(similarity[connected], pair_a[connected], pair_b[connected])] +
+                      [(float(score), int(b), int(a)) for score, a, b in
+                       zip(similarity[connected], pair_a[connected], pair_b[connected])])
+    found = sorted((float(score), origin, comparison) for row in matrix.to_lists()
+                   for score, origin, comparison in row)
+
+    assert found == expected
+    assert report["connections"] == int(connected.sum())
+    assert report["dtw computed"] < report["pairs"]
@@ -0,0 +1,88 @@
+"""
+Tests of launch- an incremental run gives the same analysis database when it is interrupted and run again, and
+the exports of a batch get different folders
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("PySimpleGUI")
+
+import constants
+import launch
+from data_analysis import Analyze
+from data_division import Divide
+from database import DatabaseManager
+
+START_END = "-test-incremental"
+
+# the number of ripples of each of the exports a, b and c- every export is a superset of the one before
+RIPPLE_COUNTS = (20, 35, 50)
+
+
+def _ripples():
+    """Returns the ripples of a sinusoidal glucose series with noise"""
+    rng = np.random.default_rng(3)
+    time = np.arange(6000)
+    values = np.round(140 + 60 * np.sin(time / 15) + rng.integers(-4, 5, len(time)))
+    glucose = pd.DataFrame({"Timestamp": pd.date_range("2023-01-01", periods=len(values), freq="5min"),
+                            "Glucose Value (mg/dL)": values})
+
+    d = Divide(glucose=glucose)
+    trend_list = d.trend_setting()
+    ripple_list = d.generate_ripple_store(trend_list, d.parting(trend_list, 1)).ripples()
+    assert len(ripple_list) >= RIPPLE_COUNTS[-1]
+
+    return ripple_list
+
+
+def _run(ripple_list, ripple_count, export_count, path):
+    """Runs the analysis of an incremental run, with ripple_count ripples in the saved state"""
+    return launch._update_analysis_database(analyze=Analyze(ripple_list=ripple_list[:export_count]),
+                                            ripple_count=ripple_count, path=path, start_end=START_END)
+
+
+def _stored_rows(path):
+    db = DatabaseManager(path/(constants.GLUCOSE_ANALYSIS_DB+START_END+".db"))
+    return db.select("_PATTERN_ANALYSIS_RAW_DATA", order_by="ID")
+
+
+@pytest.mark.parametrize("interrupted", [1, 2])
+def test_interrupted_incremental_run_is_idempotent(tmp_path, interrupted):
+    ripple_list = _ripples()
+    expected_path = tmp_path / "expected"
+    retried_path = tmp_path / "retried"
+    expected_path.mkdir()
+    retried_path.mkdir()
+
+    ripple_count = 0
+    for export, export_count in enumerate(RIPPLE_COUNTS):
+        expected = _run(ripple_list, ripple_count, export_count, expected_path)
+
+        # the interrupted run writes its connections but not its state, so it is run again from the same state
+        if export == interrupted:
+            _run(ripple_list, ripple_count, export_count, retried_path)
+        retried = _run(ripple_list, ripple_count, export_count, retried_path)
+
+        assert retried == expected
+        ripple_count = export_count
+
+    expected_rows = _stored_rows(expected_path)
+    assert _stored_rows(retried_path) == expected_rows
+    assert len(set(row[1:] for row in expected_rows)) == len(expected_rows)
+
+    # the same connections as comparing all the ripples at once
+    full = Analyze(ripple_list=ripple_list[:RIPPLE_COUNTS[-1]]).compare_graphs()
+    assert sorted(row[1:] for row in expected_rows) == sorted(item for element in full for item in element)
+
+
+@pytest.mark.parametrize("names,expected", [
+    (["a/x.csv", "b/x.csv", "x_1.csv"], ["x", "x_1", "x_1_1"]),
+    (["x.csv", "x_1.csv", "b/x.csv"], ["x", "x_1", "x_2"]),
+    (["x.csv", "b/x.csv", "c/x.csv", "y.csv"], ["x", "x_1", "x_2", "y"]),
+])
+def test_patient_names_are_unique(names, expected):
+    assert launch._get_patient_names(file_locations=[Path(name) for name in names]) == expected
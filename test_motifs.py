@@ -0,0 +1,131 @@
+"""
+Tests that motifs.matrix_profile() gives the same profile as a brute force z-normalized distance matrix, and the
+motifs, discords and ripples found from it
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import motifs
+from data_division import Divide
+
+
+def _series(kind, length, seed=0):
+    """Returns a glucose series of whole numbers"""
+    rng = np.random.default_rng(seed)
+    values = np.round(120 + 10 * np.cumsum(rng.normal(size=length)))
+
+    if kind == "sinusoidal":
+        values = np.round(140 + 50 * np.sin(np.arange(length) / 9) + rng.integers(-3, 4, length))
+    elif kind == "plateaus":
+        # sensor plateaus, clipped low values and a stuck value
+        values[length // 5:length // 5 + 30] = 40
+        values[length // 2:length // 2 + 25] = values[length // 2]
+        values[-20:] = 40
+
+    return values
+
+
+def _brute_force_profile(values, window, flat_matches):
+    """Returns the matrix profile of the full z-normalized distance matrix"""
+    windows = np.lib.stride_tricks.sliding_window_view(np.asarray(values, dtype=np.float64), window)
+    flat = windows.max(axis=1) == windows.min(axis=1)
+    deviation = np.where(flat, 1.0, windows.std(axis=1))
+    normalized = (windows - windows.mean(axis=1, keepdims=True)) / deviation[:, None]
+
+    distance = np.sqrt(np.maximum(((normalized[:, None, :] - normalized[None, :, :]) ** 2).sum(axis=2), 0))
+    # a flat window is uncorrelated to a window with a shape
+    distance[flat[:, None] != flat[None, :]] = math.sqrt(2 * window)
+    distance[flat[:, None] & flat[None, :]] = 0.0 if flat_matches else np.inf
+    positions = np.arange(len(windows))
+    distance[np.abs(positions[:, None] - positions[None, :]) < motifs.exclusion_zone(window)] = np.inf
+
+    profile = distance.min(axis=1)
+    if not flat_matches:
+        profile[flat] = np.inf
+
+    return profile, distance
+
+
+@pytest.mark.parametrize("kind", ["random", "sinusoidal", "plateaus"])
+@pytest.mark.parametrize("length,window", [(60, 4), (150, 7), (300, 12), (400, 24)])
+@pytest.mark.parametrize("flat_matches", [False, True])
+def test_matrix_profile_matches_brute_force(kind, length, window, flat_matches):
+    values = _series(kind, length)
+    profile, profile_index = motifs.matrix_profile(values, window, flat_matches=flat_matches)
+    expected, distance = _brute_force_profile(values, window, flat_matches)
+
+    assert np.array_equal(np.isinf(profile), np.isinf(expected))
+    found = np.isfinite(expected)
+    # the squared distances are compared, a distance close to 0 loses half of its digits in the square root
+    assert np.allclose(profile[found] ** 2, expected[found] ** 2, atol=1e-6)
+    # the index points to a match at the distance of the profile
+    assert (profile_index[~found] == -1).all()
+    assert np.allclose(distance[np.flatnonzero(found), profile_index[found]] ** 2, expected[found] ** 2, atol=1e-6)
+
+
+def test_short_series():
+    assert len(motifs.matrix_profile(np.arange(5.0), 6)[0]) == 0
+    profile, profile_index = motifs.matrix_profile(np.arange(5.0), 5)
+    assert np.isinf(profile).all() and (profile_index == -1).all()
+
+
+@pytest.mark.parametrize("window", [12, 13, 24])
+def test_top_motifs_and_discords_do_not_overlap(window):
+    values = _series("plateaus", 1500, seed=1)
+    profile, profile_index = motifs.matrix_profile(values, window)
+    exclusion = motifs.exclusion_zone(window)
+
+    found = motifs.top_motifs(profile, profile_index, window, count=5)
+    assert [distance for _, _, distance in found] == sorted(distance for _, _, distance in found)
+    starts = [position for start, match, _ in found for position in (start, match)]
+    for number, start in enumerate(starts):
+        assert all(abs(start - other) >= exclusion for other in starts[number + 1:])
+
+    # the plateaus are neither motifs nor discords
+    flat = np.ptp(np.lib.stride_tricks.sliding_window_view(values, window), axis=1) == 0
+    discords = motifs.top_discords(profile, window, count=5)
+    assert not any(flat[start] for start in starts)
+    assert not any(flat[start] for start, _ in discords)
+    discord_starts = [start for start, _ in discords]
+    for number, start in enumerate(discord_starts):
+        assert all(abs(start - other) >= window for other in discord_starts[number + 1:])
+
+
+def test_ripples_of_window():
+    offset = np.array([0, 10, 25])
+    length = np.array([10, 15, 5])
+
+    assert motifs.ripples_of_window(offset, length, 8, 3) == [0, 1]
+    assert motifs.ripples_of_window(offset, length, 10, 5) == [1]
+    assert motifs.ripples_of_window(offset, length, 24, 10) == [1, 2]
+    # after the last ripple
+    assert motifs.ripples_of_window(offset, length, 30, 4) == []
+
+
+def test_find_motifs_searches_the_tail():
+    values = _series("sinusoidal", 2000)
+    glucose = pd.DataFrame({"Timestamp": pd.date_range("2023-01-01", periods=len(values), freq="5min"),
+                            "Glucose Value (mg/dL)": values})
+    d = Divide(glucose=glucose)
+    trend_list = d.trend_setting()
+    store = d.generate_ripple_store(trend_list, d.parting(trend_list, 1))
+    assert len(store.bg) < len(values)
+
+    window = 24
+    results = motifs.find_motifs(store, glucose=glucose, windows=(window,), count=2000)
+    profile, _ = motifs.matrix_profile(values, window)
+    assert len(results) == 1 and results[0]["window"] == window
+
+    for start, match, distance, ripples, match_ripples in results[0]["motifs"]:
+        assert math.isclose(distance, profile[start])
+        assert ripples == motifs.ripples_of_window(store.offset, store.length, start, window)
+        assert match_ripples == motifs.ripples_of_window(store.offset, store.length, match, window)
+    # some windows end in the tail, after the last ripple- they are not searched without the glucose dataframe
+    tail_starts = range(len(store.bg) - window + 1, len(values) - window + 1)
+    assert any(start in tail_starts or match in tail_starts for start, match, *_ in results[0]["motifs"])
+    for start, match, *_ in motifs.find_motifs(store, windows=(window,), count=2000)[0]["motifs"]:
+        assert start not in tail_starts and match not in tail_starts
@@ -0,0 +1,71 @@
+"""
+Tests that the lookups of sax_index.SaxIndex find the same connections as Analyze.compare_graphs() for the ripples
+they check
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_analysis import Analyze
+from data_division import Divide
+from sax_index import ALPHABET_SIZE, SaxIndex, paa
+
+
+def _ripples():
+    rng = np.random.default_rng(9)
+    time = np.arange(8000)
+    values = np.round(150 + 60 * np.sin(time / 13) + 25 * np.sin(time / 4.7) + rng.integers(-5, 6, len(time)))
+    glucose = pd.DataFrame({"Timestamp": pd.date_range("2023-01-01", periods=len(values), freq="5min"),
+                            "Glucose Value (mg/dL)": values})
+
+    d = Divide(glucose=glucose)
+    trend_list = d.trend_setting()
+    return d.generate_ripple_store(trend_list, d.parting(trend_list, 1)).ripples()
+
+
+def test_paa_is_the_mean_of_the_segments():
+    graphs = [np.arange(16.0), np.arange(5.0), np.array([3.0])]
+    approximation = paa(graphs, word_length=4)
+
+    assert np.allclose(approximation[0], [1.5, 5.5, 9.5, 13.5])
+    # a graph shorter than the word has segments of one value
+    assert np.allclose(approximation[1], [0, 1, 2, 3.5])
+    assert np.allclose(approximation[2], [3, 3, 3, 3])
+
+
+@pytest.mark.parametrize("min_percent", [0.0, 0.5, 0.7])
+def test_lookup_of_every_word_matches_compare_graphs(min_percent):
+    ripple_list = _ripples()
+    index = SaxIndex(ripple_list)
+    connections = Analyze(ripple_list=ripple_list).compare_graphs(min_percent=min_percent)
+
+    # with the tolerance of the whole alphabet every ripple is a candidate
+    for ripple_index in range(len(ripple_list)):
+        assert index.lookup(ripple_index, min_percent=min_percent, tolerance=ALPHABET_SIZE) == \
+               sorted(connections[ripple_index])
+
+
+@pytest.mark.parametrize("tolerance", [0, 1])
+def test_lookup_matches_compare_graphs_for_its_candidates(tolerance):
+    ripple_list = _ripples()
+    index = SaxIndex(ripple_list)
+    connections = Analyze(ripple_list=ripple_list).compare_graphs(min_percent=0.5)
+
+    for ripple_index in range(len(ripple_list)):
+        candidates = set(index.candidates(ripple_index, tolerance=tolerance).tolist())
+        assert ripple_index not in candidates
+        expected = sorted(item for item in connections[ripple_index] if item[2] in candidates)
+        assert index.lookup(ripple_index, min_percent=0.5, tolerance=tolerance) == expected
+
+
+def test_candidates_are_the_ripples_of_close_words():
+    ripple_list = _ripples()
+    index = SaxIndex(ripple_list)
+
+    for ripple_index in range(0, len(ripple_list), 7):
+        distance = np.abs(index.words.astype(np.int64) - index.words[ripple_index]).max(axis=1)
+        for tolerance in (0, 1, 2):
+            expected = np.flatnonzero(distance <= tolerance)
+            assert index.candidates(ripple_index, tolerance=tolerance).tolist() == \
+                   [other for other in expected.tolist() if other != ripple_index]